@@ -1,11 +1,327 @@
-from flask import Flask, render_template_string, jsonify, request
+from flask import Flask, render_template_string, jsonify, request, send_from_directory
 from flask_cors import CORS
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import _thread
+import argparse
+import atexit
+import concurrent.futures.process
+import contextlib
+import csv
+import gc
+import gzip
+import hashlib
+import http.client
+import importlib
+import json
 import math
-
-app = Flask(__name__)
-CORS(app)
-
-ASTEROIDS = {
+import mimetypes
+import multiprocessing
+import os
+import posixpath
+import re
+import secrets
+import shutil
+import signal
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+import unicodedata
+import urllib.error
+import urllib.parse
+import urllib.request
+import zlib
+import numpy as np
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import gunicorn.app.base
+except ImportError:
+    gunicorn = None
+
+try:
+    import gevent.monkey
+except ImportError:
+    gevent = None
+
+try:
+    from flask_sock import Sock, ConnectionClosed
+except ImportError:
+    Sock = None
+
+app = Flask(__name__, static_folder=None)
+CORS(app, expose_headers=['X-Data-Version', 'Retry-After'])
+
+KM_PER_DEGREE = 111.32
+MEGATON_J = 4.184e15
+CITY_RADIUS_KM = 50
+DEFAULT_DENSITY = 2500
+DEFAULT_ALBEDO = 0.14
+
+SHARED_TABLE_DIR = os.environ.get('SHARED_TABLE_DIR', os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'egypteroids'))
+
+# path -> pid of the process that wrote it
+shared_table_files = {}
+
+def remove_shared_table(path):
+    shared_table_files.pop(path, None)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def remove_shared_tables():
+    # forked workers inherit this hook; each removes only the files it wrote
+    for path, pid in list(shared_table_files.items()):
+        if pid == os.getpid():
+            remove_shared_table(path)
+
+atexit.register(remove_shared_tables)
+
+def share_arrays(owner, names, prefix, root=SHARED_TABLE_DIR):
+    # Files are content-addressed, so a process holding the same data attaches
+    # to the existing mapping instead of writing its own copy. Every process
+    # then reads the same physical pages through a read-only memmap.
+    os.makedirs(root, exist_ok=True)
+    for name in names:
+        array = np.ascontiguousarray(getattr(owner, name))
+        digest = hashlib.sha1(array.dtype.str.encode('ascii') + repr(array.shape).encode('ascii') + array.tobytes()).hexdigest()[:16]
+        path = os.path.join(root, '%s-%s-%s.npy' % (prefix, name, digest))
+        if not os.path.exists(path):
+            tmp_path = '%s.%d.tmp.npy' % (path[:-4], os.getpid())
+            np.save(tmp_path, array)
+            os.replace(tmp_path, path)
+            shared_table_files[path] = os.getpid()
+        setattr(owner, name, np.load(path, mmap_mode='r') if array.size else array)
+
+def unshare_arrays(owner, names):
+    for name in names:
+        array = getattr(owner, name)
+        if isinstance(array, np.memmap):
+            setattr(owner, name, np.array(array))
+
+def shared_paths(owner, names):
+    return {getattr(owner, name).filename for name in names if isinstance(getattr(owner, name), np.memmap)}
+
+# Mappings survive an unlink, so readers of the old tables keep working while
+# the files stop taking up space
+def remove_superseded_tables(old_owner, new_owner, names):
+    for path in shared_paths(old_owner, names) - shared_paths(new_owner, names):
+        remove_shared_table(path)
+
+class NEOCatalog(Mapping):
+    SHARED_ARRAYS = ('diameter_km', 'density', 'spectral_code', 'mass_kg', 'energy_per_velocity2',
+                     'name_keys', 'name_order')
+
+    def __init__(self):
+        self.names = []
+        self.index = {}
+        self.featured = []
+        self.diameter_km = np.empty(0, dtype=np.float64)
+        self.density = np.empty(0, dtype=np.float64)
+        self.spectral_code = np.empty(0, dtype=np.uint16)
+        self.mass_kg = np.empty(0, dtype=np.float64)
+        self.energy_per_velocity2 = np.empty(0, dtype=np.float64)
+        self.name_keys = np.empty(0, dtype=str)
+        self.name_order = np.empty(0, dtype=np.int64)
+        self.spectral_types = []
+        self.spectral_index = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_mapping(cls, asteroids):
+        catalog = cls()
+        catalog.ingest(dict(name=name, **fields) for name, fields in asteroids.items())
+        catalog.featured = list(asteroids)
+        return catalog
+
+    def intern_spectral_type(self, spectral_type):
+        spectral_type = spectral_type or "Unknown"
+        code = self.spectral_index.get(spectral_type)
+        if code is None:
+            code = len(self.spectral_types)
+            self.spectral_types.append(spectral_type)
+            self.spectral_index[spectral_type] = code
+        return code
+
+    def __getitem__(self, name):
+        i = self.index[name]
+        return {
+            "diameter_km": float(self.diameter_km[i]),
+            "spectral_type": self.spectral_types[self.spectral_code[i]],
+            "density": float(self.density[i])
+        }
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __iter__(self):
+        return iter(list(self.names))
+
+    def __len__(self):
+        return len(self.names)
+
+    def ingest(self, records):
+        added = updated = unchanged = 0
+        new_names, new_diameters, new_densities, new_codes = [], [], [], []
+        with self.lock:
+            unshare_arrays(self, self.SHARED_ARRAYS)
+            for record in records:
+                row = normalize_neo_record(record)
+                if row is None:
+                    continue
+                name, diameter_km, density, spectral_type = row
+                code = self.intern_spectral_type(spectral_type)
+                i = self.index.get(name)
+                if i is None:
+                    self.index[name] = len(self.names) + len(new_names)
+                    new_names.append(name)
+                    new_diameters.append(diameter_km)
+                    new_densities.append(density)
+                    new_codes.append(code)
+                    added += 1
+                elif i >= len(self.names):
+                    j = i - len(self.names)
+                    new_diameters[j], new_densities[j], new_codes[j] = diameter_km, density, code
+                elif (self.diameter_km[i], self.density[i], self.spectral_code[i]) != (diameter_km, density, code):
+                    self.diameter_km[i] = diameter_km
+                    self.density[i] = density
+                    self.spectral_code[i] = code
+                    updated += 1
+                else:
+                    unchanged += 1
+            if new_names:
+                self.names.extend(new_names)
+                self.diameter_km = np.concatenate([self.diameter_km, np.array(new_diameters, dtype=np.float64)])
+                self.density = np.concatenate([self.density, np.array(new_densities, dtype=np.float64)])
+                self.spectral_code = np.concatenate([self.spectral_code, np.array(new_codes, dtype=np.uint16)])
+            if new_names or updated:
+                self.update_derived()
+            if new_names:
+                self.build_indexes()
+        return {"added": added, "updated": updated, "unchanged": unchanged}
+
+    def build_indexes(self):
+        keyed = sorted((name.lower(), i) for i, name in enumerate(self.names))
+        self.name_keys = np.array([key for key, _ in keyed], dtype=str)
+        self.name_order = np.array([i for _, i in keyed], dtype=np.int64)
+
+    def share(self, root=SHARED_TABLE_DIR):
+        with self.lock:
+            share_arrays(self, self.SHARED_ARRAYS, 'asteroids', root)
+
+    def fingerprint(self):
+        digest = hashlib.sha1(json.dumps([self.names, self.featured, self.spectral_types]).encode('utf-8'))
+        for name in ('diameter_km', 'density', 'spectral_code'):
+            digest.update(np.ascontiguousarray(getattr(self, name)).tobytes())
+        return digest.hexdigest()
+
+    def update_derived(self):
+        self.mass_kg = (4/3) * math.pi * (self.diameter_km * 500.0) ** 3 * self.density
+        # megatons per (km/s)^2, so energy_mt = energy_per_velocity2 * v^2
+        self.energy_per_velocity2 = 0.5 * self.mass_kg * 1e6 / MEGATON_J
+
+    def details(self, name):
+        i = self.index[name]
+        return dict(
+            name=name,
+            mass_kg=float(self.mass_kg[i]),
+            energy_megatons_per_km_s2=float(self.energy_per_velocity2[i]),
+            **self[name]
+        )
+
+    def load_file(self, path):
+        if path.lower().endswith('.json'):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict) and 'fields' in data:
+                records = (dict(zip(data['fields'], row)) for row in data.get('data', []))
+            else:
+                records = data
+            return self.ingest(records)
+        with open(path, newline='', encoding='utf-8') as f:
+            return self.ingest(csv.DictReader(f))
+
+    def name_range(self, prefix):
+        # rows whose lowercased name starts with prefix, in name order
+        if not prefix:
+            return self.name_order
+        prefix = prefix.lower()
+        width = self.name_keys.dtype.itemsize // 4
+        if len(prefix) > width:
+            return self.name_order[:0]
+        lo = np.searchsorted(self.name_keys, prefix, side='left')
+        hi = np.searchsorted(self.name_keys, prefix.ljust(width, '\U0010ffff'), side='right')
+        return self.name_order[lo:hi]
+
+    def query(self, spectral_type=None, min_diameter=None, max_diameter=None, prefix=None,
+              sort='name', descending=False, offset=0, limit=50):
+        with self.lock:
+            n = len(self.names)
+            mask = np.ones(n, dtype=bool)
+            if spectral_type is not None:
+                code = self.spectral_index.get(spectral_type)
+                if code is None:
+                    mask[:] = False
+                else:
+                    mask &= self.spectral_code[:n] == code
+            if min_diameter is not None:
+                mask &= self.diameter_km[:n] >= min_diameter
+            if max_diameter is not None:
+                mask &= self.diameter_km[:n] <= max_diameter
+            rows = self.name_range(prefix)
+            rows = rows[mask[rows]]
+
+            if sort == 'name':
+                if descending:
+                    rows = rows[::-1]
+            else:
+                column = {"diameter_km": self.diameter_km, "density": self.density}[sort]
+                rows = np.sort(rows)
+                rows = rows[np.argsort(column[rows], kind='stable')]
+                if descending:
+                    rows = rows[::-1]
+
+            page = rows[offset:offset + limit]
+            items = [dict(name=self.names[i], **self[self.names[i]]) for i in page]
+        return {"total": int(rows.size), "offset": offset, "limit": limit, "items": items}
+
+def normalize_neo_record(record):
+    name = (record.get('name') or record.get('full_name') or '').strip()
+    if not name:
+        return None
+
+    def number(*keys):
+        for key in keys:
+            value = record.get(key)
+            if value not in (None, ''):
+                try:
+                    return float(value)
+                except (TypeError, ValueError):
+                    pass
+        return None
+
+    diameter_km = number('diameter_km', 'diameter')
+    if diameter_km is None:
+        h = number('H', 'h')
+        if h is None:
+            return None
+        albedo = number('albedo') or DEFAULT_ALBEDO
+        diameter_km = 1329.0 / math.sqrt(albedo) * 10 ** (-h / 5)
+    density = number('density') or DEFAULT_DENSITY
+    spectral_type = (record.get('spectral_type') or record.get('spec_B') or record.get('spec_T') or '').strip()
+    return name, diameter_km, density, spectral_type
+
+DEFAULT_ASTEROIDS = {
     "Sisyphus": {"diameter_km": 8.48, "spectral_type": "S", "density": 2500},
     "Sekhmet": {"diameter_km": 0.935, "spectral_type": "Unknown", "density": 2500},
     "Moshup": {"diameter_km": 1.317, "spectral_type": "S", "density": 2500},
@@ -17,7 +333,244 @@ ASTEROIDS = {
     "Apollo": {"diameter_km": 1.5, "spectral_type": "Q", "density": 2500}
 }
 
-LOCATIONS = {
+def load_asteroid_catalog():
+    catalog = NEOCatalog.from_mapping(DEFAULT_ASTEROIDS)
+    for catalog_path in filter(None, os.environ.get('NEO_CATALOG_PATH', '').split(os.pathsep)):
+        catalog.load_file(catalog_path)
+    return catalog
+
+ASTEROIDS = load_asteroid_catalog()
+
+GEONAMES_COLUMNS = {"name": 1, "asciiname": 2, "lat": 4, "lon": 5, "country": 8, "population": 14}
+
+def search_key(name):
+    return unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii').lower().strip()
+
+class CityCatalog(Mapping):
+    SHARED_ARRAYS = ('lat', 'lon', 'population', 'country_code', 'search_keys', 'search_rows',
+                     'search_population', 'lat_order', 'sorted_lat')
+
+    def __init__(self):
+        self.names = []
+        self.index = {}
+        self.featured = []
+        self.lat = np.empty(0, dtype=np.float64)
+        self.lon = np.empty(0, dtype=np.float64)
+        self.population = np.empty(0, dtype=np.int64)
+        self.country_code = np.empty(0, dtype=np.uint16)
+        self.countries = []
+        self.country_index = {}
+        self.areas = {}
+        self.search_keys = np.empty(0, dtype='S1')
+        self.search_rows = np.empty(0, dtype=np.int64)
+        self.search_population = np.empty(0, dtype=np.int64)
+        self.lat_order = np.empty(0, dtype=np.int64)
+        self.sorted_lat = np.empty(0, dtype=np.float64)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_mapping(cls, locations):
+        catalog = cls()
+        catalog.ingest(dict(name=name, **fields) for name, fields in locations.items())
+        catalog.featured = list(locations)
+        return catalog
+
+    def intern_country(self, country):
+        code = self.country_index.get(country)
+        if code is None:
+            code = len(self.countries)
+            self.countries.append(country)
+            self.country_index[country] = code
+        return code
+
+    def __getitem__(self, name):
+        i = self.index[name]
+        return {
+            "lat": float(self.lat[i]),
+            "lon": float(self.lon[i]),
+            "population": int(self.population[i]),
+            "country": self.countries[self.country_code[i]],
+            "area": self.areas.get(i, "Unknown")
+        }
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __iter__(self):
+        return iter(list(self.names))
+
+    def __len__(self):
+        return len(self.names)
+
+    def ingest(self, records):
+        rows = []
+        with self.lock:
+            for record in records:
+                try:
+                    name = record['name'].strip()
+                    country = record.get('country') or "Unknown"
+                    row = (float(record['lat']), float(record['lon']), int(float(record.get('population') or 0)), country)
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if not name:
+                    continue
+                if name in self.index:
+                    name = "%s, %s" % (name, country)
+                    if name in self.index:
+                        continue
+                self.index[name] = len(self.names)
+                self.names.append(name)
+                if record.get('area'):
+                    self.areas[self.index[name]] = record['area']
+                rows.append(row)
+            if rows:
+                lat, lon, population, countries = zip(*rows)
+                self.lat = np.concatenate([self.lat, np.array(lat, dtype=np.float64)])
+                self.lon = np.concatenate([self.lon, np.array(lon, dtype=np.float64)])
+                self.population = np.concatenate([self.population, np.array(population, dtype=np.int64)])
+                codes = np.array([self.intern_country(c) for c in countries], dtype=np.uint16)
+                self.country_code = np.concatenate([self.country_code, codes])
+                self.build_indexes()
+        return len(rows)
+
+    def build_indexes(self):
+        keyed = sorted((search_key(name), i) for i, name in enumerate(self.names))
+        # search keys are ASCII, so a fixed-width bytes array can live in shared memory
+        self.search_keys = np.array([key.encode('ascii') for key, _ in keyed], dtype=bytes)
+        self.search_rows = np.array([i for _, i in keyed], dtype=np.int64)
+        self.search_population = self.population[self.search_rows]
+        self.lat_order = np.argsort(self.lat, kind='stable')
+        self.sorted_lat = self.lat[self.lat_order]
+
+    def share(self, root=SHARED_TABLE_DIR):
+        with self.lock:
+            share_arrays(self, self.SHARED_ARRAYS, 'cities', root)
+
+    def fingerprint(self):
+        digest = hashlib.sha1(json.dumps([self.names, self.featured, self.countries, sorted(self.areas.items())]).encode('utf-8'))
+        for name in ('lat', 'lon', 'population', 'country_code'):
+            digest.update(np.ascontiguousarray(getattr(self, name)).tobytes())
+        return digest.hexdigest()
+
+    def load_file(self, path):
+        if path.lower().endswith('.json'):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                data = [dict(name=name, **fields) for name, fields in data.items()]
+            return self.ingest(data)
+        if path.lower().endswith('.csv'):
+            with open(path, newline='', encoding='utf-8') as f:
+                return self.ingest(csv.DictReader(f))
+        # GeoNames dump (cities15000.txt, allCountries.txt, ...)
+        with open(path, encoding='utf-8') as f:
+            return self.ingest(
+                {key: fields[col] for key, col in GEONAMES_COLUMNS.items()}
+                for fields in (line.rstrip('\n').split('\t') for line in f)
+                if len(fields) > GEONAMES_COLUMNS['population']
+            )
+
+    def search(self, query, limit=10):
+        key = search_key(query).encode('ascii')
+        width = self.search_keys.dtype.itemsize
+        if not key or len(key) > width:
+            return []
+        with self.lock:
+            lo = np.searchsorted(self.search_keys, key, side='left')
+            hi = np.searchsorted(self.search_keys, key.ljust(width, b'\xff'), side='right')
+            population = self.search_population[lo:hi]
+            if population.size > limit:
+                top = np.argpartition(-population, limit - 1)[:limit]
+            else:
+                top = np.arange(population.size)
+            top = top[np.argsort(-population[top], kind='stable')]
+            rows = self.search_rows[lo + top]
+        return [dict(name=self.names[i], **self[self.names[i]]) for i in rows]
+
+    # Featured entries are metro-area totals. Once a gazetteer lists the cities
+    # around one, counting the metro row as well would count those people twice.
+    def metro_rows_covered(self, rows):
+        featured = {self.index[name] for name in self.featured if name in self.index}
+        covered = np.zeros(len(rows), dtype=bool)
+        for i, row in enumerate(rows):
+            if row in featured:
+                nearby, _ = self.cities_within(self.lat[row], self.lon[row], CITY_RADIUS_KM)
+                covered[i] = any(other not in featured for other in nearby)
+        return covered
+
+    def cities_within(self, lat, lon, radius_km):
+        # latitude-sorted index prunes to a band before the exact haversine pass
+        dlat = radius_km / KM_PER_DEGREE
+        with self.lock:
+            lo = np.searchsorted(self.sorted_lat, lat - dlat, side='left')
+            hi = np.searchsorted(self.sorted_lat, lat + dlat, side='right')
+            rows = self.lat_order[lo:hi]
+            distance_km = haversine_km(lat, lon, self.lat[rows], self.lon[rows])
+        inside = distance_km <= radius_km
+        return rows[inside], distance_km[inside]
+
+EARTH_RADIUS_KM = 6371.0
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(x) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def geodesic_circle(lat, lon, radius_km, vertices=256):
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    angular = radius_km / EARTH_RADIUS_KM
+    bearing = np.linspace(0, 2 * math.pi, vertices, endpoint=False)
+    lat2 = np.arcsin(math.sin(lat1) * math.cos(angular) + math.cos(lat1) * math.sin(angular) * np.cos(bearing))
+    lon2 = lon1 + np.arctan2(np.sin(bearing) * math.sin(angular) * math.cos(lat1),
+                             math.cos(angular) - math.sin(lat1) * np.sin(lat2))
+    # keep longitudes continuous so rings crossing the antimeridian don't wrap
+    ring = np.column_stack([np.degrees(np.unwrap(lon2)), np.degrees(lat2)])
+    return np.vstack([ring, ring[:1]])
+
+def simplify_line(points, tolerance):
+    # iterative Douglas-Peucker
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = points[end] - points[start]
+        offsets = points[start + 1:end] - points[start]
+        length = math.hypot(*segment)
+        if length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return points[keep]
+
+def zoom_tolerance_deg(zoom):
+    # half a 256 px tile pixel at this zoom
+    return 360.0 / (256 * 2 ** zoom) / 2
+
+MAX_CONTOUR_VERTICES = 64
+
+def contour_polygon(lat, lon, radius_km, zoom):
+    circle = geodesic_circle(lat, lon, radius_km)
+    half = len(circle) // 2
+    tolerance = zoom_tolerance_deg(zoom)
+    while True:
+        # split the closed ring in two so the simplifier has distinct endpoints
+        ring = np.vstack([simplify_line(circle[:half + 1], tolerance)[:-1], simplify_line(circle[half:], tolerance)])
+        if len(ring) <= MAX_CONTOUR_VERTICES:
+            break
+        tolerance *= 2
+    decimals = max(0, math.ceil(-math.log10(tolerance)))
+    return [np.round(ring, decimals).tolist()]
+
+DEFAULT_LOCATIONS = {
     "Tokyo": {"lat": 35.6762, "lon": 139.6503, "population": 37400000, "country": "Japan", "area": "8,547 km²"},
     "Berlin": {"lat": 52.5200, "lon": 13.4050, "population": 3645000, "country": "Germany", "area": "891 km²"},
     "Sao Paulo": {"lat": -23.5505, "lon": -46.6333, "population": 12300000, "country": "Brazil", "area": "7,946 km²"},
@@ -27,28 +580,199 @@ LOCATIONS = {
     "Paris": {"lat": 48.8566, "lon": 2.3522, "population": 10900000, "country": "France", "area": "17,174 km²"}
 }
 
+def load_city_catalog():
+    catalog = CityCatalog.from_mapping(DEFAULT_LOCATIONS)
+    for catalog_path in filter(None, os.environ.get('CITY_CATALOG_PATH', '').split(os.pathsep)):
+        catalog.load_file(catalog_path)
+    return catalog
+
+LOCATIONS = load_city_catalog()
+
+def data_version(asteroids, locations):
+    return hashlib.sha1((asteroids.fingerprint() + locations.fingerprint()).encode('ascii')).hexdigest()[:16]
+
+DATA_VERSION = data_version(ASTEROIDS, LOCATIONS)
+
 def calculate_impact_energy(diameter_km, velocity_km_s, density_kg_m3):
     radius_m = (diameter_km * 1000) / 2
     volume_m3 = (4/3) * math.pi * (radius_m ** 3)
     mass_kg = volume_m3 * density_kg_m3
     velocity_m_s = velocity_km_s * 1000
     energy_joules = 0.5 * mass_kg * (velocity_m_s ** 2)
-    energy_megatons = energy_joules / 4.184e15
+    energy_megatons = energy_joules / MEGATON_J
     return energy_megatons
 
-def calculate_psi_radius(energy_megatons, psi_value):
-    if psi_value == 20:
-        C = 0.28
-    elif psi_value == 3:
-        C = 1.04
-    else:
-        C = 1.0
+MIN_PSI = 0.5
+MAX_PSI = 200.0
+BURST_TYPES = ('surface', 'airburst')
+# legacy surface-burst calibration points, in km per Mt^(1/3)
+PSI_ANCHORS = {20: 0.28, 3: 1.04}
+
+def kinney_graham_psi(scaled_distance):
+    z = scaled_distance
+    ratio = 808 * (1 + (z / 4.5) ** 2) / np.sqrt((1 + (z / 0.048) ** 2) * (1 + (z / 0.32) ** 2) * (1 + (z / 1.35) ** 2))
+    return ratio * 14.696
+
+def build_overpressure_table(points=512):
+    z = np.logspace(-1.5, 3, 20000)
+    free_air_psi = kinney_graham_psi(z)
+    log_psi = np.log(np.union1d(np.geomspace(MIN_PSI, MAX_PSI, points), list(PSI_ANCHORS)))
+
+    def free_air_distance(psi):
+        return np.interp(-np.log(psi), -np.log(free_air_psi), z)
+
+    # hemispherical surface burst reflects like a 2W free-air charge; an airburst at
+    # optimum height sees roughly doubled (Mach-reflected) incident overpressure
+    surface = free_air_distance(np.exp(log_psi)) * 2 ** (1/3)
+    airburst = free_air_distance(np.exp(log_psi) / 2)
+
+    anchor_log_psi = np.log(sorted(PSI_ANCHORS))
+    anchor_scale = [PSI_ANCHORS[psi] / (free_air_distance(psi) * 2 ** (1/3)) for psi in sorted(PSI_ANCHORS)]
+    scale = np.interp(log_psi, anchor_log_psi, anchor_scale)
+
+    return log_psi, {"surface": surface * scale, "airburst": airburst * scale}, airburst
+
+# the uncalibrated airburst distances double as slant ranges in km per Mt^(1/3)
+OVERPRESSURE_LOG_PSI, OVERPRESSURE_TABLE, OVERPRESSURE_SLANT_RANGE = build_overpressure_table()
+
+def scaled_psi_distance(psi_value, burst='surface'):
+    psi = np.asarray(psi_value, dtype=np.float64)
+    if np.any((psi < MIN_PSI) | (psi > MAX_PSI)):
+        raise ValueError("psi must be between %g and %g" % (MIN_PSI, MAX_PSI))
+    return np.interp(np.log(psi), OVERPRESSURE_LOG_PSI, OVERPRESSURE_TABLE[burst])
+
+# The airburst curve assumes the optimum burst height. For a burst at a known
+# altitude the ground range shrinks like the horizontal leg of the slant range,
+# in scaled units, and vanishes once the burst is higher than that range.
+def burst_height_factor(energy_megatons, psi_value, height_km):
+    slant_range = np.interp(np.log(psi_value), OVERPRESSURE_LOG_PSI, OVERPRESSURE_SLANT_RANGE)
+    scaled_height = np.asarray(height_km, dtype=np.float64) / np.maximum(np.cbrt(energy_megatons), 1e-12)
+    return np.sqrt(np.maximum(1 - (scaled_height / slant_range) ** 2, 0.0))
+
+def calculate_psi_radius(energy_megatons, psi_value, burst='surface', height_km=0.0):
+    C = float(scaled_psi_distance(psi_value, burst))
     radius_km = C * (energy_megatons ** (1/3))
+    if height_km:
+        radius_km *= float(burst_height_factor(energy_megatons, psi_value, height_km))
     return radius_km
 
+class PopulationRaster:
+    def __init__(self, sat, meta):
+        self.sat = sat
+        self.nrows = int(meta['nrows'])
+        self.ncols = int(meta['ncols'])
+        self.xllcorner = float(meta['xllcorner'])
+        self.yllcorner = float(meta['yllcorner'])
+        self.cellsize = float(meta['cellsize'])
+        self.ymax = self.yllcorner + self.nrows * self.cellsize
+        self.is_global = abs(self.ncols * self.cellsize - 360.0) < self.cellsize
+
+    @classmethod
+    def open(cls, prefix):
+        with open(prefix + '.json', encoding='utf-8') as f:
+            meta = json.load(f)
+        sat = np.load(prefix + '.sat.npy', mmap_mode='r')
+        return cls(sat, meta)
+
+    def _span_sums(self, rows, j0, j1):
+        S = self.sat
+        return (S[rows + 1, j1 + 1] - S[rows, j1 + 1]) - (S[rows + 1, j0] - S[rows, j0])
+
+    def cell_population(self, row, col):
+        return float(self._span_sums(np.array([row]), np.array([col]), np.array([col]))[0])
+
+    def population_within(self, lat, lon, radius_km):
+        cell = self.cellsize
+        row_c = math.floor((self.ymax - lat) / cell)
+        col_c = math.floor((lon - self.xllcorner) / cell)
+        if self.is_global:
+            col_c %= self.ncols
+        if not (0 <= row_c < self.nrows and 0 <= col_c < self.ncols):
+            return 0.0
+
+        cell_area_km2 = (cell * KM_PER_DEGREE) ** 2 * max(math.cos(math.radians(lat)), 1e-6)
+        circle_area_km2 = math.pi * radius_km ** 2
+        if circle_area_km2 < cell_area_km2:
+            return self.cell_population(row_c, col_c) * circle_area_km2 / cell_area_km2
+
+        # one summed-area lookup per raster row crossed by the circle: O(radius)
+        dlat = radius_km / KM_PER_DEGREE
+        r0 = max(int(math.ceil((self.ymax - (lat + dlat)) / cell - 0.5)), 0)
+        r1 = min(int(math.floor((self.ymax - (lat - dlat)) / cell - 0.5)), self.nrows - 1)
+        if r1 < r0:
+            return 0.0
+        rows = np.arange(r0, r1 + 1)
+        row_lat = self.ymax - (rows + 0.5) * cell
+        dy_km = (row_lat - lat) * KM_PER_DEGREE
+        half_km = np.sqrt(np.maximum(radius_km ** 2 - dy_km ** 2, 0.0))
+        dlon = half_km / (KM_PER_DEGREE * np.maximum(np.cos(np.radians(row_lat)), 1e-6))
+
+        j0 = np.ceil((lon - dlon - self.xllcorner) / cell - 0.5).astype(np.int64)
+        j1 = np.floor((lon + dlon - self.xllcorner) / cell - 0.5).astype(np.int64)
+        total = 0.0
+        if self.is_global:
+            full = (j1 - j0 + 1) >= self.ncols
+            j0[full] = 0
+            j1[full] = self.ncols - 1
+            shift = np.floor_divide(j0, self.ncols) * self.ncols
+            j0 -= shift
+            j1 -= shift
+            wrapped = j1 >= self.ncols
+            if wrapped.any():
+                total += self._span_sums(rows[wrapped], np.zeros(wrapped.sum(), dtype=np.int64), j1[wrapped] - self.ncols).sum()
+                j1[wrapped] = self.ncols - 1
+        else:
+            j0 = np.maximum(j0, 0)
+            j1 = np.minimum(j1, self.ncols - 1)
+        valid = j1 >= j0
+        total += self._span_sums(rows[valid], j0[valid], j1[valid]).sum()
+        return float(total)
+
+def build_population_raster(ascii_grid_path, prefix):
+    meta = {}
+    with open(ascii_grid_path, encoding='utf-8') as f:
+        # NODATA_value is optional, so the header runs to the first numeric row
+        line = f.readline()
+        while line.split() and line.split()[0][0].isalpha():
+            key, value = line.split()[:2]
+            meta[key.lower()] = float(value)
+            line = f.readline()
+        nrows, ncols = int(meta['nrows']), int(meta['ncols'])
+        cellsize = meta['cellsize']
+        nodata = meta.get('nodata_value')
+        # *center headers place the lower-left cell's centre, not its corner
+        xllcorner = meta['xllcorner'] if 'xllcorner' in meta else meta['xllcenter'] - cellsize / 2
+        yllcorner = meta['yllcorner'] if 'yllcorner' in meta else meta['yllcenter'] - cellsize / 2
+        sat = np.lib.format.open_memmap(prefix + '.sat.npy', mode='w+', dtype=np.float64, shape=(nrows + 1, ncols + 1))
+        sat[0, :] = 0.0
+        for i in range(nrows):
+            row = np.array(line.split(), dtype=np.float64)
+            if row.size != ncols:
+                raise ValueError("row %d has %d values, expected %d" % (i + 1, row.size, ncols))
+            if nodata is not None:
+                row[row == nodata] = 0.0
+            sat[i + 1, 0] = 0.0
+            sat[i + 1, 1:] = sat[i, 1:] + np.cumsum(row)
+            line = f.readline()
+        sat.flush()
+    with open(prefix + '.json', 'w', encoding='utf-8') as f:
+        json.dump({
+            "nrows": nrows,
+            "ncols": ncols,
+            "xllcorner": xllcorner,
+            "yllcorner": yllcorner,
+            "cellsize": cellsize
+        }, f)
+
+POPULATION_RASTER = None
+if os.environ.get('POPULATION_RASTER_PATH'):
+    POPULATION_RASTER = PopulationRaster.open(os.environ['POPULATION_RASTER_PATH'])
+
 def estimate_affected_population(radius_km, city_data):
+    if POPULATION_RASTER is not None:
+        return int(POPULATION_RASTER.population_within(city_data['lat'], city_data['lon'], radius_km))
     city_population = city_data['population']
-    city_area_km2 = math.pi * (50 ** 2)
+    city_area_km2 = math.pi * (CITY_RADIUS_KM ** 2)
     impact_area_km2 = math.pi * (radius_km ** 2)
     if impact_area_km2 < city_area_km2:
         affected = city_population * (impact_area_km2 / city_area_km2)
@@ -56,6 +780,187 @@ def estimate_affected_population(radius_km, city_data):
         affected = city_population
     return int(affected)
 
+def calculate_impact_energy_np(diameter_km, velocity_km_s, density_kg_m3):
+    radius_m = np.asarray(diameter_km, dtype=np.float64) * 500.0
+    mass_kg = (4/3) * math.pi * radius_m ** 3 * np.asarray(density_kg_m3, dtype=np.float64)
+    velocity_m_s = np.asarray(velocity_km_s, dtype=np.float64) * 1000.0
+    return 0.5 * mass_kg * velocity_m_s ** 2 / MEGATON_J
+
+def calculate_psi_radius_np(energy_megatons, psi_value, burst='surface', height_km=0.0):
+    C = scaled_psi_distance(psi_value, burst)
+    return C * np.cbrt(energy_megatons) * burst_height_factor(energy_megatons, psi_value, height_km)
+
+def estimate_affected_population_np(radius_km, population):
+    city_area_km2 = math.pi * (CITY_RADIUS_KM ** 2)
+    impact_area_km2 = math.pi * np.asarray(radius_km, dtype=np.float64) ** 2
+    fraction = np.minimum(impact_area_km2 / city_area_km2, 1.0)
+    return (np.asarray(population, dtype=np.float64) * fraction).astype(np.int64)
+
+
+def circle_overlap_area(r1, r2, d):
+    r1, r2, d = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64) for x in (r1, r2, d)))
+    area = np.zeros(d.shape)
+    contained = d <= np.abs(r1 - r2)
+    area[contained] = math.pi * np.minimum(r1, r2)[contained] ** 2
+    partial = ~contained & (d < r1 + r2)
+    r1, r2, d = r1[partial], r2[partial], d[partial]
+    a1 = r1 ** 2 * np.arccos(np.clip((d ** 2 + r1 ** 2 - r2 ** 2) / (2 * d * r1), -1, 1))
+    a2 = r2 ** 2 * np.arccos(np.clip((d ** 2 + r2 ** 2 - r1 ** 2) / (2 * d * r2), -1, 1))
+    a3 = 0.5 * np.sqrt(np.maximum((-d + r1 + r2) * (d + r1 - r2) * (d - r1 + r2) * (d + r1 + r2), 0))
+    area[partial] = a1 + a2 - a3
+    return area
+
+def estimate_affected_population_multi(radius_km, population, distance_km):
+    # each city is the same uniform disc estimate_affected_population uses, offset by its distance
+    city_area_km2 = math.pi * (CITY_RADIUS_KM ** 2)
+    overlap = circle_overlap_area(radius_km, CITY_RADIUS_KM, distance_km)
+    return (np.asarray(population, dtype=np.float64) * overlap / city_area_km2).astype(np.int64)
+
+SCALE_HEIGHT_M = 8000.0
+SEA_LEVEL_AIR_DENSITY = 1.225
+DRAG_COEFFICIENT = 2.0
+HEAT_TRANSFER_COEFFICIENT = 0.1
+ABLATION_HEAT_J_KG = 8e6
+PANCAKE_FACTOR = 7.0
+ENTRY_ALTITUDE_M = 100000.0
+ENTRY_TIME_STEP_S = 0.005
+DEFAULT_IMPACT_ANGLE = 45.0
+# Earth's escape velocity to the fastest retrograde solar-system impacts; also
+# bounds how many Euler steps a single entry can take
+MIN_ENTRY_VELOCITY = 11.0
+MAX_ENTRY_VELOCITY = 72.0
+
+def integrate_entry(diameter_km, density_kg_m3, velocity_km_s, angle_deg, dt=ENTRY_TIME_STEP_S):
+    # pancake model (Chyba et al. 1993) integrated with fixed-step Euler over the whole batch
+    diameter_km, density, velocity_km_s, angle_deg = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (diameter_km, density_kg_m3, velocity_km_s, angle_deg))
+    )
+    n = diameter_km.size
+    r0 = diameter_km.ravel() * 500.0
+    rho_i = density.ravel().copy()
+    v = velocity_km_s.ravel() * 1000.0
+    sin_angle = np.sin(np.radians(angle_deg.ravel()))
+    m = (4/3) * math.pi * r0 ** 3 * rho_i
+    initial_energy = 0.5 * m * v ** 2
+    strength = 10 ** (2.107 + 0.0624 * np.sqrt(rho_i))
+
+    z = np.full(n, ENTRY_ALTITUDE_M)
+    r = r0.copy()
+    dr = np.zeros(n)
+    broken = np.zeros(n, dtype=bool)
+    active = np.ones(n, dtype=bool)
+    breakup_altitude = np.full(n, np.nan)
+    burst_altitude = np.full(n, np.nan)
+    final_energy = initial_energy.copy()
+
+    while active.any():
+        idx = np.flatnonzero(active)
+        zi, vi, mi, ri = z[idx], v[idx], m[idx], r[idx]
+        rho_a = SEA_LEVEL_AIR_DENSITY * np.exp(-zi / SCALE_HEIGHT_M)
+        area = math.pi * ri ** 2
+        ram = rho_a * vi ** 2
+
+        newly_broken = ~broken[idx] & (ram > strength[idx])
+        breakup_altitude[idx[newly_broken]] = zi[newly_broken]
+        broken[idx[newly_broken]] = True
+
+        dv = -DRAG_COEFFICIENT * ram * area / (2 * mi)
+        dm = -HEAT_TRANSFER_COEFFICIENT * ram * vi * area / (2 * ABLATION_HEAT_J_KG)
+        ddr = np.where(broken[idx], DRAG_COEFFICIENT * ram / (rho_i[idx] * ri), 0.0)
+
+        z[idx] = zi - vi * sin_angle[idx] * dt
+        v[idx] = np.maximum(vi + dv * dt, 0.0)
+        m[idx] = np.maximum(mi + dm * dt, 0.0)
+        dr[idx] += ddr * dt
+        r[idx] = ri + dr[idx] * dt
+
+        energy = 0.5 * m[idx] * v[idx] ** 2
+        burst = (r[idx] >= PANCAKE_FACTOR * r0[idx]) | (v[idx] < 500.0) | (m[idx] <= 0.0)
+        grounded = ~burst & (z[idx] <= 0.0)
+        burst_altitude[idx[burst]] = np.maximum(z[idx[burst]], 0.0)
+        final_energy[idx[burst]] = 0.0
+        final_energy[idx[grounded]] = energy[grounded]
+        active[idx[burst | grounded]] = False
+
+    shape = diameter_km.shape
+    return {
+        "breakup_altitude_km": (breakup_altitude / 1000.0).reshape(shape),
+        "burst_altitude_km": (burst_altitude / 1000.0).reshape(shape),
+        "energy_deposited_megatons": ((initial_energy - final_energy) / MEGATON_J).reshape(shape),
+        "ground_energy_megatons": (final_energy / MEGATON_J).reshape(shape)
+    }
+
+def entry_outcomes(scenarios):
+    outcomes = [entry_cache.get(key) for key in scenarios]
+    missing = sorted({key for key, outcome in zip(scenarios, outcomes) if outcome is None})
+    if missing:
+        solved = integrate_entry(*np.array(missing, dtype=np.float64).T)
+        computed = {}
+        for i, key in enumerate(missing):
+            breakup, burst, deposited, ground = (solved[name][i] for name in (
+                "breakup_altitude_km", "burst_altitude_km", "energy_deposited_megatons", "ground_energy_megatons"
+            ))
+            outcome = {
+                "outcome": "ground_impact" if np.isnan(burst) else "airburst",
+                "breakup_altitude_km": None if np.isnan(breakup) else round(float(breakup), 2),
+                "airburst_altitude_km": None if np.isnan(burst) else round(float(burst), 2),
+                "energy_deposited_megatons": float(deposited),
+                "ground_energy_megatons": float(ground)
+            }
+            entry_cache.put(key, outcome)
+            computed[key] = outcome
+        outcomes = [outcome or computed[key] for key, outcome in zip(scenarios, outcomes)]
+    return outcomes
+
+def entry_blast(outcome):
+    if outcome["outcome"] == "airburst":
+        return outcome["energy_deposited_megatons"], "airburst", outcome["airburst_altitude_km"]
+    return outcome["ground_energy_megatons"], "surface", 0.0
+
+MONTE_CARLO_DEFAULT_SAMPLES = 100000
+MONTE_CARLO_MAX_SAMPLES = 2000000
+MONTE_CARLO_PERCENTILES = (5, 50, 95)
+
+def sample_impact_parameters(rng, asteroid, velocity_km_s, samples,
+                             diameter_uncertainty=0.3, density_uncertainty=0.2,
+                             velocity_uncertainty=0.1):
+    diameter_km = asteroid['diameter_km'] * rng.lognormal(0.0, math.log1p(diameter_uncertainty), samples)
+    density = rng.normal(asteroid['density'], asteroid['density'] * density_uncertainty, samples)
+    np.clip(density, 1000.0, 8000.0, out=density)
+    velocity = rng.normal(velocity_km_s, velocity_km_s * velocity_uncertainty, samples)
+    np.maximum(velocity, 1.0, out=velocity)
+    # impact angles follow dP = sin(2θ) dθ, i.e. sin²θ is uniform
+    angle_rad = np.arcsin(np.sqrt(rng.random(samples)))
+    return diameter_km, density, velocity, angle_rad
+
+def run_monte_carlo(asteroid, location, velocity_km_s, samples=MONTE_CARLO_DEFAULT_SAMPLES, seed=0, **uncertainties):
+    rng = np.random.default_rng(seed)
+    diameter_km, density, velocity, angle_rad = sample_impact_parameters(
+        rng, asteroid, velocity_km_s, samples, **uncertainties
+    )
+    energy_mt = calculate_impact_energy_np(diameter_km, velocity, density)
+    # oblique impacts couple less energy into the blast (sin^(1/3) θ scaling)
+    angle_factor = np.cbrt(np.sin(angle_rad))
+    radius_20_psi = calculate_psi_radius_np(energy_mt, 20) * angle_factor
+    radius_3_psi = calculate_psi_radius_np(energy_mt, 3) * angle_factor
+
+    outcomes = {
+        "energy_megatons": energy_mt,
+        "severe_radius_km": radius_20_psi,
+        "moderate_radius_km": radius_3_psi,
+        "severe_affected": estimate_affected_population_np(radius_20_psi, location['population']),
+        "moderate_affected": estimate_affected_population_np(radius_3_psi, location['population'])
+    }
+
+    summary = {}
+    for name, values in outcomes.items():
+        percentiles = np.percentile(values, MONTE_CARLO_PERCENTILES)
+        summary[name] = {
+            "p%d" % q: (int(v) if name.endswith('_affected') else round(float(v), 2))
+            for q, v in zip(MONTE_CARLO_PERCENTILES, percentiles)
+        }
+    return summary
+
 HTML_TEMPLATE = """
 <!DOCTYPE html>
 <html lang="en">
@@ -63,509 +968,8 @@ HTML_TEMPLATE = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Simulation</title>
-    <link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css" />
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            background-image: url('https://i.postimg.cc/RCgsp5by/kai-pilger-Ef6i-L87-v-OA-unsplash.jpg');
-            background-repeat: no-repeat;
-            background-size: 200%;
-            color: #e8e8e8;
-            min-height: 100vh;
-        }
-
-        .container {
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 20px;
-        }
-
-        header {
-            text-align: center;
-            padding: 30px 20px;
-            background: #1a1a1a;
-            border-radius: 12px;
-            margin-bottom: 30px;
-            border: 1px solid #333;
-        }
-
-        h1 {
-            font-size: 3em;
-            color: #fff;
-            margin-bottom: 10px;
-            font-weight: 700;
-            letter-spacing: 2px;
-        }
-
-        .subtitle {
-            font-size: 1.1em;
-            color: #999;
-        }
-
-        .main-layout {
-            display: flex;
-            flex-direction: column;
-            gap: 25px;
-            margin-bottom: 30px;
-        }
-
-        .controls-row {
-            display: grid;
-            grid-template-columns: 1fr 1fr 1fr;
-            gap: 20px;
-            background: #1a1a1a;
-            border-radius: 12px;
-            padding: 25px;
-            border: 1px solid #333;
-        }
-
-        .control-group {
-            display: flex;
-            flex-direction: column;
-        }
-
-        .control-group label {
-            margin-bottom: 8px;
-            font-weight: 500;
-            color: #ccc;
-            font-size: 0.95em;
-            display: flex;
-            align-items: center;
-            gap: 8px;
-        }
-
-        .tooltip {
-            position: relative;
-            display: inline-block;
-            cursor: help;
-        }
-
-        .tooltip-icon {
-            width: 18px;
-            height: 18px;
-            background: #444;
-            color: #fff;
-            border-radius: 50%;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 12px;
-            font-weight: bold;
-        }
-
-        .tooltip:hover .tooltip-icon {
-            background: #666;
-        }
-
-        .tooltip-text {
-            visibility: hidden;
-            width: 280px;
-            background: #2a2a2a;
-            color: #e8e8e8;
-            text-align: center;
-            border-radius: 8px;
-            padding: 12px;
-            position: absolute;
-            z-index: 1000;
-            bottom: 125%;
-            left: 50%;
-            margin-left: -140px;
-            opacity: 0;
-            transition: opacity 0.3s;
-            font-size: 0.85em;
-            line-height: 1.4;
-            border: 1px solid #444;
-            box-shadow: 0 4px 12px rgba(0,0,0,0.5);
-        }
-
-        .tooltip-text::after {
-            content: "";
-            position: absolute;
-            top: 100%;
-            left: 50%;
-            margin-left: -5px;
-            border-width: 5px;
-            border-style: solid;
-            border-color: #2a2a2a transparent transparent transparent;
-        }
-
-        .tooltip:hover .tooltip-text {
-            visibility: visible;
-            opacity: 1;
-        }
-
-        select {
-            width: 100%;
-            padding: 12px;
-            border-radius: 8px;
-            border: 1px solid #444;
-            background: #0d0d0d;
-            color: #e8e8e8;
-            font-size: 1em;
-            cursor: pointer;
-        }
-
-        select:hover {
-            border-color: #666;
-        }
-
-        select:focus {
-            outline: none;
-            border-color: #888;
-        }
-
-        select option {
-            background: #1a1a1a;
-            color: #fff;
-        }
-
-        .info-box {
-            margin-top: 10px;
-            padding: 12px;
-            background: #0d0d0d;
-            border-radius: 8px;
-            border: 1px solid #333;
-            font-size: 0.9em;
-            display: none;
-        }
-
-        .info-box.active {
-            display: block;
-        }
-
-        .info-box strong {
-            color: #fff;
-        }
-
-        input[type="range"] {
-            width: 100%;
-            height: 8px;
-            border-radius: 5px;
-            background: linear-gradient(to right, #333, #666);
-            outline: none;
-            -webkit-appearance: none;
-        }
-
-        input[type="range"]::-webkit-slider-thumb {
-            -webkit-appearance: none;
-            width: 20px;
-            height: 20px;
-            border-radius: 50%;
-            background: #fff;
-            cursor: pointer;
-            box-shadow: 0 0 10px rgba(255, 255, 255, 0.5);
-        }
-
-        input[type="range"]::-moz-range-thumb {
-            width: 20px;
-            height: 20px;
-            border-radius: 50%;
-            background: #fff;
-            cursor: pointer;
-            box-shadow: 0 0 10px rgba(255, 255, 255, 0.5);
-            border: none;
-        }
-
-        .speed-display {
-            text-align: center;
-            margin: 10px 0;
-            font-size: 1.8em;
-            color: #fff;
-            font-weight: bold;
-        }
-
-        .simulate-section {
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            gap: 10px;
-            margin-top: 10px;
-        }
-
-        .simulate-btn {
-            padding: 15px 40px;
-            background: #fff;
-            border: none;
-            border-radius: 10px;
-            color: #000;
-            font-size: 1.1em;
-            font-weight: bold;
-            cursor: pointer;
-            transition: all 0.3s;
-        }
-
-        .simulate-btn:hover {
-            background: #f0f0f0;
-            transform: translateY(-2px);
-        }
-
-        .simulate-btn:disabled {
-            background: #555;
-            color: #888;
-            cursor: not-allowed;
-        }
-
-        #map {
-            height: 650px;
-            border-radius: 12px;
-            border: 2px solid #333;
-            display: none;
-        }
-
-        #map.active {
-            display: block;
-        }
-
-        .map-placeholder {
-            height: 650px;
-            border-radius: 12px;
-            border: 2px dashed #444;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            flex-direction: column;
-            background: #1a1a1a;
-        }
-
-        .map-placeholder.hidden {
-            display: none;
-        }
-
-        .placeholder-content {
-            text-align: center;
-            color: #666;
-        }
-
-        .placeholder-content h3 {
-            font-size: 2em;
-            margin-bottom: 15px;
-            color: #999;
-        }
-
-        .results-panel {
-            background: #1a1a1a;
-            border-radius: 12px;
-            padding: 25px;
-            border: 1px solid #333;
-            margin-top: 25px;
-            display: none;
-        }
-
-        .results-panel.active {
-            display: block;
-        }
-
-        .results-panel h3 {
-            margin-bottom: 20px;
-            color: #fff;
-            font-size: 1.8em;
-        }
-
-        .result-item {
-            margin-bottom: 15px;
-            padding: 15px;
-            background: #0d0d0d;
-            border-radius: 8px;
-            border-left: 4px solid #fff;
-        }
-
-        .result-item strong {
-            color: #fff;
-        }
-
-        .damage-zone {
-            margin: 10px 0;
-            padding: 15px;
-            border-radius: 8px;
-        }
-
-        .damage-zone.severe {
-            border-left: 4px solid #fff;
-            background: rgba(255, 255, 255, 0.05);
-        }
-
-        .damage-zone.moderate {
-            border-left: 4px solid #888;
-            background: rgba(136, 136, 136, 0.05);
-        }
-
-        .damage-zone h4 {
-            margin-bottom: 10px;
-            color: #fff;
-        }
-
-        .research-btn {
-            width: 100%;
-            padding: 12px;
-            background: #2a2a2a;
-            border: 1px solid #444;
-            border-radius: 10px;
-            color: #e8e8e8;
-            font-size: 1em;
-            font-weight: bold;
-            cursor: pointer;
-            margin-top: 30px;
-            max-width: 400px;
-            display: block;
-            margin-left: auto;
-            margin-right: auto;
-            transition: all 0.3s;
-        }
-
-        .research-btn:hover {
-            background: #333;
-        }
-
-        .modal {
-            display: none;
-            position: fixed;
-            z-index: 1000;
-            left: 0;
-            top: 0;
-            width: 100%;
-            height: 100%;
-            background: rgba(0, 0, 0, 0.9);
-            overflow-y: auto;
-        }
-
-        .modal.active {
-            display: block;
-        }
-
-        .modal-content {
-            background: #1a1a1a;
-            margin: 50px auto;
-            padding: 40px;
-            border-radius: 15px;
-            max-width: 800px;
-            border: 1px solid #333;
-        }
-
-        .close-btn {
-            float: right;
-            font-size: 2em;
-            font-weight: bold;
-            cursor: pointer;
-            color: #fff;
-        }
-
-        .close-btn:hover {
-            color: #ccc;
-        }
-
-        .research-section {
-            margin: 20px 0;
-        }
-
-        .research-section h3 {
-            color: #fff;
-            margin-bottom: 10px;
-            font-size: 1.5em;
-        }
-
-        .research-section h4 {
-            color: #ccc;
-            margin-top: 15px;
-            margin-bottom: 8px;
-        }
-
-        .research-section ul {
-            margin-left: 20px;
-            line-height: 1.8;
-        }
-
-        .research-section p {
-            line-height: 1.8;
-            margin-bottom: 10px;
-        }
-
-        .impact-animation {
-            position: fixed;
-            top: 0;
-            left: 0;
-            width: 100%;
-            height: 100%;
-            pointer-events: none;
-            z-index: 9999;
-            display: none;
-        }
-
-        .impact-animation.active {
-            display: block;
-        }
-
-        .meteor {
-            position: absolute;
-            width: 50px;
-            height: 50px;
-            background: radial-gradient(circle, #fff, #ccc);
-            border-radius: 50%;
-            box-shadow: 0 0 20px #fff;
-            opacity: 0;
-        }
-
-        .meteor.falling {
-            animation: meteorFall 1.5s ease-in forwards;
-        }
-
-        @keyframes meteorFall {
-            0% {
-                opacity: 0;
-                transform: translate(-200px, -200px) scale(0.5);
-            }
-            20% {
-                opacity: 1;
-            }
-            100% {
-                opacity: 1;
-                transform: translate(0, 0) scale(1);
-            }
-        }
-
-        .impact-flash {
-            position: absolute;
-            width: 150px;
-            height: 150px;
-            background: radial-gradient(circle, rgba(255,255,255,1), transparent);
-            border-radius: 50%;
-            opacity: 0;
-        }
-
-        .impact-flash.active {
-            animation: flash 0.5s ease-out;
-        }
-
-        @keyframes flash {
-            0% {
-                opacity: 0;
-                transform: scale(0);
-            }
-            50% {
-                opacity: 1;
-                transform: scale(1);
-            }
-            100% {
-                opacity: 0;
-                transform: scale(2);
-            }
-        }
-
-        @media (max-width: 1024px) {
-            .controls-row {
-                grid-template-columns: 1fr;
-            }
-            
-            h1 {
-                font-size: 2em;
-            }
-        }
-    </style>
+    <link rel="stylesheet" href="{{ asset('vendor/leaflet/leaflet.css') }}" />
+    <link rel="stylesheet" href="{{ asset('css/simulation.css') }}">
 </head>
 <body>
     <div class="container">
@@ -601,6 +1005,8 @@ HTML_TEMPLATE = """
                             <span class="tooltip-text">Some of the most popular cities in the world</span>
                         </span>
                     </label>
+                    <input type="text" class="city-search" id="location-search" list="location-suggestions" placeholder="Search any city..." autocomplete="off">
+                    <datalist id="location-suggestions"></datalist>
                     <select id="location-select">
                         <option value="">-- Choose City --</option>
                     </select>
@@ -623,6 +1029,7 @@ HTML_TEMPLATE = """
                     <input type="range" id="velocity-slider" min="10" max="70" step="10" value="40">
                     <div class="simulate-section">
                         <button class="simulate-btn" id="simulate-btn">SIMULATE IMPACT</button>
+                        <label class="fast-mode"><input type="checkbox" id="fast-mode"> Fast mode (skip animation, preload results)</label>
                     </div>
                 </div>
             </div>
@@ -651,346 +1058,8 @@ HTML_TEMPLATE = """
         <div class="impact-flash" id="impact-flash"></div>
     </div>
 
-    <script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
-    <script>
-        const API_URL = window.location.origin;
-        
-        let map;
-        let markers = {};
-        let circles = {};
-
-        function initMap() {
-            map = L.map('map').setView([20, 0], 2);
-            
-            L.tileLayer('https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}', {
-                attribution: 'Esri',
-                maxZoom: 18
-            }).addTo(map);
-
-            L.tileLayer('https://{s}.basemaps.cartocdn.com/dark_only_labels/{z}/{x}/{y}{r}.png', {
-                maxZoom: 18,
-                opacity: 0.7
-            }).addTo(map);
-        }
-
-        async function loadData() {
-            try {
-                const asteroidsRes = await fetch(API_URL + '/api/asteroids');
-                const locationsRes = await fetch(API_URL + '/api/locations');
-                
-                const asteroids = await asteroidsRes.json();
-                const locations = await locationsRes.json();
-                
-                addLocationMarkers(locations);
-            } catch (error) {
-                console.error('Error loading map markers:', error);
-            }
-        }
-
-        function addLocationMarkers(locations) {
-            const cityIcon = L.divIcon({
-                className: 'custom-marker',
-                html: '💥',
-                iconSize: [30, 30],
-                iconAnchor: [15, 30]
-            });
-
-            for (const cityName in locations) {
-                if (locations.hasOwnProperty(cityName)) {
-                    const cityData = locations[cityName];
-                    const marker = L.marker([cityData.lat, cityData.lon], { icon: cityIcon })
-                        .addTo(map)
-                        .bindPopup('<b>' + cityName + '</b>');
-                    markers[cityName] = marker;
-                }
-            };
-            }
-
-        document.getElementById('velocity-slider').addEventListener('input', function(e) {
-            document.getElementById('velocity-value').textContent = e.target.value;
-        });
-
-        // Asteroid info
-        document.getElementById('asteroid-select').addEventListener('change', function(e) {
-            const asteroidName = e.target.value;
-            const infoBox = document.getElementById('asteroid-info');
-            
-            if (!asteroidName) {
-                infoBox.classList.remove('active');
-                return;
-            }
-
-            fetch(API_URL + '/api/simulate', {
-                method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({ asteroid: asteroidName, location: 'Tokyo', velocity: 40 })
-            })
-            .then(response => response.json())
-            .then(details => {
-                document.getElementById('asteroid-diameter').textContent = details.asteroid_info.diameter_km + ' km';
-                document.getElementById('asteroid-type').textContent = details.asteroid_info.spectral_type || 'Unknown';
-                infoBox.classList.add('active');
-            })
-            .catch(error => console.error('Error:', error));
-        });
-
-        // City info
-        document.getElementById('location-select').addEventListener('change', function(e) {
-            const cityName = e.target.value;
-            const cityInfoBox = document.getElementById('city-info');
-            
-            if (!cityName) {
-                cityInfoBox.classList.remove('active');
-                return;
-            }
-
-            fetch(API_URL + '/api/locations')
-            .then(response => response.json())
-            .then(locations => {
-                const cityData = locations[cityName];
-                if (cityData) {
-                    document.getElementById('city-country').textContent = cityData.country;
-                    document.getElementById('city-population').textContent = (cityData.population / 1000000).toFixed(1) + ' million';
-                    document.getElementById('city-area').textContent = cityData.area;
-                    cityInfoBox.classList.add('active');
-                }
-            })
-            .catch(error => console.error('Error:', error));
-        });
-
-        document.getElementById('simulate-btn').addEventListener('click', function() {
-            const asteroid = document.getElementById('asteroid-select').value;
-            const location = document.getElementById('location-select').value;
-            const velocity = parseInt(document.getElementById('velocity-slider').value);
-
-            if (!asteroid || !location) {
-                alert('Please select both an asteroid and a location!');
-                return;
-            }
-
-            document.getElementById('map').classList.add('active');
-            document.getElementById('map-placeholder').classList.add('hidden');
-
-            if (!map) {
-                initMap();
-                loadData();
-            }
-
-            const btn = document.getElementById('simulate-btn');
-            btn.textContent = 'CALCULATING...';
-            btn.disabled = true;
-
-            fetch(API_URL + '/api/simulate', {
-                method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({ asteroid: asteroid, location: location, velocity: velocity })
-            })
-            .then(response => response.json())
-            .then(result => {
-                setTimeout(function() {
-                    document.getElementById('map').scrollIntoView({ behavior: 'smooth', block: 'center' });
-                }, 200);
-                
-                setTimeout(function() {
-                    playImpactAnimation(result.coordinates);
-                }, 1000);
-
-                setTimeout(function() {
-                    displayResults(result);
-                    drawDamageZones(result);
-                    const explosion = document.getElementById('explosion');
-                    explosion.play();
-                }, 2600);
-
-                btn.textContent = 'SIMULATE IMPACT';
-                btn.disabled = false;
-            })
-            .catch(error => {
-                console.error('Error:', error);
-                alert('Error simulating impact');
-                btn.textContent = 'SIMULATE IMPACT';
-                btn.disabled = false;
-            });
-        });
-
-        function playImpactAnimation(coords) {
-            const animContainer = document.getElementById('impact-animation');
-            const meteor = document.getElementById('meteor');
-            const flash = document.getElementById('impact-flash');
-
-            const mapEl = document.getElementById('map');
-            const rect = mapEl.getBoundingClientRect();
-            
-            const targetX = rect.left + rect.width / 2;
-            const targetY = rect.top + rect.height / 2;
-
-            meteor.style.left = targetX + 'px';
-            meteor.style.top = targetY + 'px';
-            flash.style.left = (targetX - 75) + 'px';
-            flash.style.top = (targetY - 75) + 'px';
-
-            animContainer.classList.add('active');
-            meteor.classList.add('falling');
-
-            setTimeout(function() {
-                flash.classList.add('active');
-            }, 1500);
-
-            setTimeout(function() {
-                animContainer.classList.remove('active');
-                meteor.classList.remove('falling');
-                flash.classList.remove('active');
-            }, 2500);
-        }
-
-        function displayResults(result) {
-            const severeArea = Math.PI * Math.pow(result.damage_zones.severe.radius_km, 2);
-            const moderateArea = Math.PI * Math.pow(result.damage_zones.moderate.radius_km, 2);
-            const hiroshimaMultiplier = Math.round(result.energy_megatons / 0.015);
-            const craterDiameter = (result.asteroid_info.diameter_km * 20).toFixed(1);
-            
-            const htmlContent = '<div class="result-item">' +
-                '<p><strong>Asteroid:</strong> ' + result.asteroid + ' (' + result.asteroid_info.diameter_km + ' km diameter)</p>' +
-                '<p><strong>Impact Location:</strong> ' + result.location + '</p>' +
-                '<p><strong>Impact Velocity:</strong> ' + result.velocity_km_s + ' km/s</p>' +
-                '<p><strong>Impact Energy:</strong> ' + result.energy_megatons.toLocaleString() + ' megatons of TNT (that is ' + hiroshimaMultiplier.toLocaleString() + 'x the Hiroshima Bomb!)</p>' +
-                '<p><strong>Crater Diameter:</strong> Approximately ' + craterDiameter + ' km</p>' +
-                '</div>' +
-                '<div class="damage-zone severe">' +
-                '<h4>SEVERE DAMAGE ZONE (20 PSI)</h4>' +
-                '<p><strong>Radius:</strong> ' + result.damage_zones.severe.radius_km + ' km</p>' +
-                '<p><strong>Area Affected:</strong> ' + severeArea.toFixed(1) + ' km²</p>' +
-                '<p><strong>Effects:</strong> ' + result.damage_zones.severe.description + '</p>' +
-                '<p><strong>Estimated Casualties:</strong> ' + result.damage_zones.severe.estimated_affected.toLocaleString() + ' people</p>' +
-                '</div>' +
-                '<div class="damage-zone moderate">' +
-                '<h4>MODERATE DAMAGE ZONE (3 PSI)</h4>' +
-                '<p><strong>Radius:</strong> ' + result.damage_zones.moderate.radius_km + ' km</p>' +
-                '<p><strong>Area Affected:</strong> ' + moderateArea.toFixed(1) + ' km²</p>' +
-                '<p><strong>Effects:</strong> ' + result.damage_zones.moderate.description + '</p>' +
-                '<p><strong>Estimated Casualties:</strong> ' + result.damage_zones.moderate.estimated_affected.toLocaleString() + ' people</p>' +
-                '</div>';
-            
-            document.getElementById('results-content').innerHTML = htmlContent;
-            document.getElementById('results-panel').classList.add('active');
-        }
-
-        function drawDamageZones(result) {
-            Object.values(circles).forEach(function(c) { map.removeLayer(c); });
-            circles = {};
-
-            const coords = [result.coordinates.lat, result.coordinates.lon];
-            map.flyTo(coords, 9, {duration: 1.5});
-
-            setTimeout(function() {
-                circles.moderate = L.circle(coords, {
-                    color: '#888',
-                    fillColor: '#666',
-                    fillOpacity: 0.2,
-                    weight: 2,
-                    radius: result.damage_zones.moderate.radius_km * 1000
-                }).addTo(map).bindPopup('3 PSI Zone<br>' + result.damage_zones.moderate.radius_km + ' km');
-
-                circles.severe = L.circle(coords, {
-                    color: '#fff',
-                    fillColor: '#444',
-                    fillOpacity: 0.3,
-                    weight: 2,
-                    radius: result.damage_zones.severe.radius_km * 1000
-                }).addTo(map).bindPopup('20 PSI Zone<br>' + result.damage_zones.severe.radius_km + ' km');
-
-                
-            }, 500);
-        }
-
-        document.getElementById('research-btn').addEventListener('click', function() {
-            console.log(window.location.href.split("/")[2])
-            window.location.href = "/"
-        });
-
-        window.addEventListener('load', function() {
-            console.log('Page loaded!');
-            console.log('API_URL is:', API_URL);
-            
-            var asteroidSelect = document.getElementById('asteroid-select');
-            var locationSelect = document.getElementById('location-select');
-            
-            console.log('Asteroid select found:', asteroidSelect);
-            console.log('Location select found:', locationSelect);
-            
-            if (!asteroidSelect || !locationSelect) {
-                alert('ERROR: Dropdown elements not found!');
-                return;
-            }
-            
-            setTimeout(function() {
-                loadAsteroidsAndLocations();
-            }, 500);
-        });
-
-        function loadAsteroidsAndLocations() {
-            console.log('Starting to load data...');
-            console.log('API URL:', API_URL);
-            
-            // Load asteroids
-            fetch(API_URL + '/api/asteroids')
-            .then(function(response) { 
-                console.log('Asteroids response:', response);
-                if (!response.ok) throw new Error('Asteroids API failed');
-                return response.json(); 
-            })
-            .then(function(asteroids) {
-                console.log('Asteroids data received:', asteroids);
-                const select = document.getElementById('asteroid-select');
-                
-                if (!select) {
-                    console.error('Asteroid select element not found!');
-                    return;
-                }
-                
-                asteroids.forEach(function(asteroid) {
-                    const option = document.createElement('option');
-                    option.value = asteroid;
-                    option.textContent = asteroid;
-                    select.appendChild(option);
-                });
-                console.log('Added ' + asteroids.length + ' asteroids to dropdown');
-            })
-            .catch(function(error) { 
-                console.error('Error loading asteroids:', error);
-                alert('Error loading asteroids: ' + error.message);
-            });
-
-            // Load locations
-            fetch(API_URL + '/api/locations')
-            .then(function(response) { 
-                console.log('Locations response:', response);
-                if (!response.ok) throw new Error('Locations API failed');
-                return response.json(); 
-            })
-            .then(function(locations) {
-                console.log('Locations data received:', locations);
-                const select = document.getElementById('location-select');
-                
-                if (!select) {
-                    console.error('Location select element not found!');
-                    return;
-                }
-                
-                Object.keys(locations).forEach(function(location) {
-                    const option = document.createElement('option');
-                    option.value = location;
-                    option.textContent = location;
-                    select.appendChild(option);
-                });
-                console.log('Added ' + Object.keys(locations).length + ' locations to dropdown');
-            })
-            .catch(function(error) { 
-                console.error('Error loading locations:', error);
-                alert('Error loading locations: ' + error.message);
-            });
-        }
-    </script>
+    <script src="{{ asset('vendor/leaflet/leaflet.js') }}"></script>
+    <script src="{{ asset('js/simulation.js') }}"></script>
 </body>
 </html>
 """
@@ -1003,94 +1072,11 @@ HTML_WELCOME = """
 	<meta charset="UTF-8">
 	<meta name="viewport" content="width=device-width, initial-scale=1.0">
 	<title>Meteor Madness</title>
-	<link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css" />
+	<link rel="stylesheet" href="{{ asset('vendor/leaflet/leaflet.css') }}" />
 	<link rel="preconnect" href="https://fonts.googleapis.com">
 	<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
 	<link href="https://fonts.googleapis.com/css2?family=Sterion&display=swap" rel="stylesheet">
-	<style>
-		* {
-			margin: 0;
-			padding: 0;
-			box-sizing: border-box;
-
-		}
-
-		body {
-			font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-			/* background: #0d0d0d; */
-			color: #e8e8e8;
-			min-height: 100vh;
-			background-image: url('https://i.postimg.cc/nVmKB8fs/vimal-s-GBg3jy-GS-Ug-unsplash.jpg ');
-			background-repeat: no-repeat;
-			background-size:110%;
-			background-position: center;
-		}
-
-		.container {
-			max-width: 1400px;
-			margin: 0 auto;
-			padding: 20px;
-		}
-
-		.start-container {
-			display: flex;
-			flex-direction: column;
-			column-gap: 5px;
-			justify-content: center;
-			align-items: center;
-			padding-top: 150px;
-			height: 100vh;
-		}
-
-		header {
-			text-align: center;
-			padding: 30px 20px;
-			background: #1a1a1a;
-			border-radius: 12px;
-			margin-bottom: 30px;
-			border: 1px solid #333;
-		}
-
-		h1 {
-			font-size: 3em;
-			color: #fff;
-			margin-bottom: 10px;
-			font-weight: 700;
-			letter-spacing: 2px;
-		}
-
-		
-		.welcome-btn:hover {
-			background: #1d1d1d;
-		}
-
-		.welcome-btn {
-			width: 100%;
-			padding: 15px;
-			background: #2b2bfd;
-			border: 1px solid #444;
-			border-radius: 10px;
-			color: #e8e8e8;
-			font-size: 1em;
-			font-weight: bold;
-			cursor: pointer;
-			margin-top: 5px;
-			max-width: 200px;
-			display: block;
-			margin-left: auto;
-			margin-right: auto;
-			transition: all 0.3s;
-		}
-
-        .name {
-            font-size: 80px;
-            margin: 0;
-            padding: 0;
-            margin-bottom: 280px;
-            letter-spacing: 15px;
-            color: #999999
-        }
-	</style>
+	<link rel="stylesheet" href="{{ asset('css/welcome.css') }}">
 </head>
 
 <body>
@@ -1101,17 +1087,7 @@ HTML_WELCOME = """
         <button id="about-btn" onclick="aboutredirect()" class="welcome-btn">About</button>
 	</div>
 </body>
-<script>
-	startredirect = () => {
-		window.location.href = "/simulation"
-	}
-	aboutredirect = () => {
-		window.location.href = "/about"
-	}
-    gameredirect = () => {
-        window.location.href = "/game"
-    }
-</script>
+<script src="{{ asset('js/welcome.js') }}"></script>
 </html>
 """
 
@@ -1122,81 +1098,8 @@ HTML_ABOUT = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Meteor Madness</title>
-    <link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css" />
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            background-image: url('https://i.postimg.cc/RCgsp5by/kai-pilger-Ef6i-L87-v-OA-unsplash.jpg');
-            background-repeat: no-repeat;
-            background-size: 150%;
-            color: #e8e8e8;
-            min-height: 100vh;
-        }
-
-        .container {
-            margin: 0 auto;
-        }
-
-        header {
-            text-align: center;
-            padding: 30px 20px;
-            background: #1a1a1a;
-            border-radius: 12px;
-            margin-bottom: 30px;
-            border: 1px solid #333;
-        }
-
-        h1 {
-            font-size: 3em;
-            color: #fff;
-            margin-bottom: 10px;
-            font-weight: 700;
-            letter-spacing: 2px;
-        }
-
-        .research-btn {
-            width: 100%;
-            padding: 12px;
-            background: #2a2a2a;
-            border: 1px solid #444;
-            border-radius: 10px;
-            color: #e8e8e8;
-            font-size: 1em;
-            font-weight: bold;
-            cursor: pointer;
-            margin-top: 30px;
-            margin-bottom: 30px;
-            max-width: 400px;
-            display: block;
-            margin-left: auto;
-            margin-right: auto;
-            transition: all 0.3s;
-        }
-
-        .research-btn:hover {
-            background: #333;
-        }
-
-        .about-header {
-            padding-left: 20px;
-        }
-        .about-text {
-            padding-left: 40px;
-            font-size: 25px;
-        }
-        ul {
-            list-style-type: none !important;
-        }
-        .assumption {
-            padding-bottom: 4px;
-        }
-    </style>
+    <link rel="stylesheet" href="{{ asset('vendor/leaflet/leaflet.css') }}" />
+    <link rel="stylesheet" href="{{ asset('css/about.css') }}">
 </head>
 <body>
     <div class="container">
@@ -1239,11 +1142,7 @@ HTML_ABOUT = """
         <button class="research-btn" onclick="home()" id="research-btn">Back to Homepage</button>
     </div>
 </body>
-<script>
-    home = () => {
-        window.location.href = "/"
-    }
-</script>
+<script src="{{ asset('js/about.js') }}"></script>
 </html>
 """
 
@@ -1255,102 +1154,7 @@ HTML_GAME = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Space Shooter - Defend Earth</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            background-image: url('https://i.postimg.cc/RCgsp5by/kai-pilger-Ef6i-L87-v-OA-unsplash.jpg');
-            background-size: cover;
-            background-repeat: no-repeat;
-            background-position: center center;
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            min-height: 100vh;
-            font-family: 'Courier New', monospace;
-            overflow: hidden;
-        }
-
-        #gameContainer {
-            position: relative;
-            background: rgba(0, 0, 0, 0.4);
-        }
-
-        #gameCanvas {
-            display: block;
-            background-color: transparent;
-        }
-
-        #ui {
-            position: absolute;
-            top: 20px;
-            left: 20px;
-            color: rgb(40, 122, 184);
-            font-size: 20px;
-            font-weight: bold;
-            z-index: 10;
-        }
-
-        #gameOver {
-            position: absolute;
-            top: 50%;
-            left: 50%;
-            transform: translate(-50%, -50%);
-            text-align: center;
-            color: #f00;
-            font-size: 48px;
-            font-weight: bold;
-            display: none;
-            z-index: 20;
-        }
-
-        #gameOver button {
-            margin-top: 20px;
-            padding: 15px 40px;
-            font-size: 24px;
-            background: rgb(24, 74, 112);
-            color: #000;
-            border: none;
-            cursor: pointer;
-            font-family: 'Courier New', monospace;
-            font-weight: bold;
-        }
-
-        #gameOver button:hover {
-            background: rgb(40, 114, 171);
-        }
-		.start-btn {
-            width: 100%;
-            padding: 12px;
-            background: #2a2a2a;
-            border: 1px solid #444;
-            border-radius: 10px;
-            color: #e8e8e8;
-            font-size: 1em;
-            font-weight: bold;
-            cursor: pointer;
-            margin-top: 30px;
-            margin-bottom: 30px;
-            max-width: 400px;
-            display: block;
-            margin-left: auto;
-            margin-right: auto;
-            transition: all 0.3s;
-        }
-
-        .start-btn:hover {
-            background: #333;
-        }
-
-        .text {
-            z-index: 999;
-            color: white;
-        }
-    </style>
+    <link rel="stylesheet" href="{{ asset('css/game.css') }}">
 </head>
 
 <body>
@@ -1372,302 +1176,570 @@ HTML_GAME = """
         </div>
 		<button id="home" onclick="home()" class="start-btn">Return to Homepage</button>
     </div>
-    <script>
-		home = () => {
-			window.location.href = "/"
-		}
-        const canvas = document.getElementById('gameCanvas');
-        const ctx = canvas.getContext('2d');
-        const container = document.getElementById('gameContainer');
-
-        const playerImage = new Image();
-        playerImage.src = 'https://i.postimg.cc/4ytRb9Kf/5958dcd313d478f-removebg-preview.png';
-
-        let gameActive = true;
-        let score = 0;
-        let health = 100;
-        let mouseX = canvas.width / 2;
-        let mouseY = canvas.height / 2;
-        let mouseDown = false;
-
-        const player = {
-            x: canvas.width / 2 - 20,
-            y: canvas.height - 80,
-            w: 60,
-            h: 75,
-            speed: 0.15,
-        };
-
-        let bullets = [];
-        let meteors = [];
-        let lastShot = 0;
-        let meteorSpawnRate = 1000;
-        let lastMeteorSpawn = 0;
-
-        canvas.addEventListener('mousemove', (e) => {
-            const rect = canvas.getBoundingClientRect();
-            mouseX = e.clientX - rect.left;
-            mouseY = e.clientY - rect.top;
-        });
-
-        canvas.addEventListener('mousedown', (e) => {
-            if (gameActive) {
-                mouseDown = true;
-            }
-            shoot = document.getElementById('shoot');
-            shoot.play()
-        });
-
-        canvas.addEventListener('mouseup', (e) => {
-            mouseDown = false;
-        });
-
-        canvas.addEventListener('mouseleave', (e) => {
-            mouseDown = false;
-        });
-
-        function shootBullet() {
-            const now = Date.now();
-            if (now - lastShot > 200) {
-                bullets.push({
-                    x: player.x + player.w / 2 - 2,
-                    y: player.y,
-                    w: 4,
-                    h: 15,
-                    speed: 8
-                });
-                lastShot = now;
-            }
-        }
-
-        function spawnMeteor() {
-            const size = Math.random() * 30 + 20;
-            meteors.push({
-                x: Math.random() * (canvas.width - size),
-                y: -size,
-                w: size,
-                h: size,
-                speed: Math.random() * 2 + 1,
-                rotation: Math.random() * Math.PI * 2,
-                rotSpeed: (Math.random() - 0.5) * 0.1
-            });
-        }
-
-        function drawPlayer() {
-            if (playerImage.complete) {
-                ctx.drawImage(playerImage, player.x, player.y, player.w, player.h);
-            } else {
-                ctx.fillStyle = player.color;
-                ctx.beginPath();
-                ctx.moveTo(player.x + player.w / 2, player.y);
-                ctx.lineTo(player.x, player.y + player.h);
-                ctx.lineTo(player.x + player.w / 2, player.y + player.h - 10);
-                ctx.lineTo(player.x + player.w, player.y + player.h);
-                ctx.closePath();
-                ctx.fill();
-            }
-        }
-
-        function drawBullet(b) {
-            ctx.fillStyle = '#ff0';
-            ctx.fillRect(b.x, b.y, b.w, b.h);
-        }
-
-        function drawMeteor(m) {
-            ctx.save();
-            ctx.translate(m.x + m.w / 2, m.y + m.h / 2);
-            ctx.rotate(m.rotation);
-
-            ctx.fillStyle = '#7a7a7a';
-            ctx.beginPath();
-            ctx.arc(0, 0, m.w / 2, 0, Math.PI * 2);
-            ctx.fill();
-
-            ctx.fillStyle = '#5a5a5a';
-            for (let i = 0; i < 3; i++) {
-                const angle = (i / 3) * Math.PI * 2;
-                const dist = m.w / 4;
-                ctx.beginPath();
-                ctx.arc(Math.cos(angle) * dist, Math.sin(angle) * dist, m.w / 8, 0, Math.PI * 2);
-                ctx.fill();
-            }
-
-            ctx.restore();
-        }
-
-        function update() {
-            if (!gameActive) return;
-
-            const dx = mouseX - (player.x + player.w / 2);
-            const dy = mouseY - (player.y + player.h / 2);
-            player.x += dx * player.speed;
-            player.y += dy * player.speed;
-
-            player.x = Math.max(0, Math.min(canvas.width - player.w, player.x));
-            player.y = Math.max(Math.min(canvas.height - player.h, player.y), Math.min(canvas.height / 2 - player.h));
-
-            if (mouseDown) {
-                shootBullet();
-            }
-
-            bullets = bullets.filter(b => {
-                b.y -= b.speed;
-                return b.y > -b.h;
-            });
-
-            const now = Date.now();
-            if (now - lastMeteorSpawn > meteorSpawnRate) {
-                spawnMeteor();
-                lastMeteorSpawn = now;
-                meteorSpawnRate = Math.max(500, meteorSpawnRate - 5);
-            }
-
-            meteors = meteors.filter(m => {
-                m.y += m.speed;
-                m.rotation += m.rotSpeed;
-
-                const playerCenterX = player.x + player.w / 2;
-                const playerCenterY = player.y + player.h / 2;
-                const meteorCenterX = m.x + m.w / 2;
-                const meteorCenterY = m.y + m.h / 2;
-                const distToPlayer = Math.sqrt(
-                    Math.pow(playerCenterX - meteorCenterX, 2) +
-                    Math.pow(playerCenterY - meteorCenterY, 2)
-                );
-
-                if (distToPlayer < m.w / 2 + player.w / 2) {
-                    health -= 20;
-                    document.getElementById('health').textContent = health;
-                    const explosion = document.getElementById('explosion');
-                    explosion.play();
-                    if (health <= 0) {
-                        gameOver();
-                    }
-                    return false;
-                }
-
-                if (m.y > canvas.height + m.h) {
-                    health -= 10;
-                    document.getElementById('health').textContent = health;
-                    if (health <= 0) {
-                        gameOver();
-                    }
-                    return false;
-                }
-
-                for (let i = bullets.length - 1; i >= 0; i--) {
-                    const b = bullets[i];
-                    const dx = (m.x + m.w / 2) - (b.x + b.w / 2);
-                    const dy = (m.y + m.h / 2) - (b.y + b.h / 2);
-                    const dist = Math.sqrt(dx * dx + dy * dy);
-
-                    if (dist < m.w / 2 + b.h / 2) {
-                        bullets.splice(i, 1);
-                        score += 10;
-                        document.getElementById('score').textContent = score;
-                        return false;
-                    }
-                }
-
-                return true;
-            });
-        }
-
-        function draw() {
-            ctx.clearRect(0, 0, canvas.width, canvas.height);
-            drawPlayer();
-            bullets.forEach(drawBullet);
-            meteors.forEach(drawMeteor);
-        }
-
-        function gameLoop() {
-            update();
-            draw();
-            requestAnimationFrame(gameLoop);
-        }
-
-        function gameOver() {
-            gameActive = false;
-            document.getElementById('finalScore').textContent = score;
-            document.getElementById('gameOver').style.display = 'block';
-            const dead = document.getElementById('dead');
-            dead.play()
-        }
-
-        function restartGame() {
-            gameActive = true;
-            score = 0;
-            health = 100;
-            bullets = [];
-            meteors = [];
-            meteorSpawnRate = 1000;
-            player.x = canvas.width / 2 - 20;
-            player.y = canvas.height - 80;
-            document.getElementById('score').textContent = score;
-            document.getElementById('health').textContent = health;
-            document.getElementById('gameOver').style.display = 'none';
-        }
-
-        gameLoop();
-    </script>
+    <script src="{{ asset('js/game.js') }}"></script>
 </body>
 
 </html>
 """
 
+COMPRESSIBLE_MIMETYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+class PrecompiledResponse:
+    def __init__(self, body, mimetype, cache_control='no-cache'):
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {None: (body, digest)}
+        if mimetype.startswith(COMPRESSIBLE_MIMETYPES):
+            self.variants['gzip'] = (gzip.compress(body, 9, mtime=0), digest + '-gz')
+            if brotli is not None:
+                self.variants['br'] = (brotli.compress(body, quality=11), digest + '-br')
+        self.etags = [etag for _, etag in self.variants.values()]
+
+    def select_encoding(self, accept_encodings):
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and accept_encodings[encoding]:
+                return encoding
+        return None
+
+    def response(self):
+        encoding = self.select_encoding(request.accept_encodings)
+        body, etag = self.variants[encoding]
+        if any(request.if_none_match.contains(tag) for tag in self.etags):
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(body, mimetype=self.mimetype)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = self.cache_control
+        return response
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+UNVERSIONED_CACHE_CONTROL = 'public, max-age=3600'
+
+class AssetManifest:
+    def __init__(self, root):
+        self.urls = {}
+        self.assets = {}
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                logical = os.path.relpath(path, root).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    body = f.read()
+                mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                stem, ext = posixpath.splitext(logical)
+                fingerprinted = '%s.%s%s' % (stem, hashlib.sha256(body).hexdigest()[:12], ext)
+                self.urls[logical] = '/assets/' + fingerprinted
+                self.assets[fingerprinted] = PrecompiledResponse(body, mimetype, IMMUTABLE_CACHE_CONTROL)
+                # plain names stay reachable for relative references such as leaflet.css -> images/
+                self.assets[logical] = PrecompiledResponse(body, mimetype, UNVERSIONED_CACHE_CONTROL)
+
+    def url(self, logical):
+        return self.urls[logical]
+
+ASSETS = AssetManifest(STATIC_DIR)
+
+def build_pages():
+    with app.app_context():
+        return {
+            name: PrecompiledResponse(render_template_string(template, asset=ASSETS.url).encode('utf-8'), 'text/html')
+            for name, template in (
+                ('game', HTML_GAME),
+                ('simulation', HTML_TEMPLATE),
+                ('about', HTML_ABOUT),
+                ('index', HTML_WELCOME)
+            )
+        }
+
+PAGES = build_pages()
+
 @app.route('/game')
 def game():
-    return render_template_string(HTML_GAME)
+    return PAGES['game'].response()
 
 @app.route('/simulation')
 def simulate():
-    return render_template_string(HTML_TEMPLATE)
+    return PAGES['simulation'].response()
 
 @app.route('/about')
 def about():
-    return render_template_string(HTML_ABOUT)
+    return PAGES['about'].response()
 
 @app.route('/')
 def index():
-    return render_template_string(HTML_WELCOME)
+    return PAGES['index'].response()
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    compiled = ASSETS.assets.get(filename)
+    if compiled is None:
+        return jsonify({"error": "Not found"}), 404
+    return compiled.response()
+
+ASTEROID_QUERY_ARGS = ('spectral_type', 'min_diameter', 'max_diameter', 'q', 'sort', 'order', 'offset', 'limit')
+MAX_ASTEROID_PAGE = 1000
 
 @app.route('/api/asteroids')
 def get_asteroids():
-    asteroids = list(ASTEROIDS.keys())
-    return jsonify(asteroids)
+    # the full catalog can be huge; without a query only the featured names are listed
+    if not any(arg in request.args for arg in ASTEROID_QUERY_ARGS):
+        return jsonify(list(ASTEROIDS.featured))
+    
+    try:
+        min_diameter = request.args.get('min_diameter', type=float)
+        max_diameter = request.args.get('max_diameter', type=float)
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = min(max(int(request.args.get('limit', 50)), 1), MAX_ASTEROID_PAGE)
+    except ValueError:
+        return jsonify({"error": "Invalid query parameters"}), 400
+    
+    sort = request.args.get('sort', 'name')
+    if sort not in ('name', 'diameter_km', 'density'):
+        return jsonify({"error": "Invalid sort field"}), 400
+    
+    return jsonify(ASTEROIDS.query(
+        spectral_type=request.args.get('spectral_type'),
+        min_diameter=min_diameter,
+        max_diameter=max_diameter,
+        prefix=request.args.get('q'),
+        sort=sort,
+        descending=request.args.get('order') == 'desc',
+        offset=offset,
+        limit=limit
+    ))
+
+@app.route('/api/asteroids/<path:name>')
+def get_asteroid(name):
+    if name not in ASTEROIDS:
+        return jsonify({"error": "Invalid asteroid"}), 404
+    response = jsonify(ASTEROIDS.details(name))
+    response.add_etag()
+    # revalidated like /api/bootstrap, so a catalog reload shows up at once
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+MAX_LOCATION_RESULTS = 50
 
 @app.route('/api/locations')
 def get_locations():
-    return jsonify(LOCATIONS)
+    return jsonify({name: LOCATIONS[name] for name in LOCATIONS.featured})
 
-@app.route('/api/simulate', methods=['POST'])
-def simulate_impact():
-    data = request.json
-    
-    asteroid_name = data.get('asteroid')
-    location_name = data.get('location')
-    velocity = data.get('velocity')
+def build_bootstrap(asteroids, locations, version):
+    data = {
+        "asteroids": {name: asteroids[name] for name in asteroids.featured},
+        "locations": {name: locations[name] for name in locations.featured},
+        "version": version
+    }
+    body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    return PrecompiledResponse(body, 'application/json')
+
+BOOTSTRAP = build_bootstrap(ASTEROIDS, LOCATIONS, DATA_VERSION)
+
+@app.route('/api/bootstrap')
+def bootstrap():
+    return BOOTSTRAP.response()
+
+@app.route('/api/locations/search')
+def search_locations():
+    query = request.args.get('q', '')
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), MAX_LOCATION_RESULTS)
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    return jsonify({"query": query, "results": LOCATIONS.search(query, limit)})
+
+# well past any solar-system impact; also keeps int() below away from 1e300
+MAX_VELOCITY = 100.0
+
+def normalize_velocity(velocity):
+    velocity = float(velocity)
+    if not 0 < velocity <= MAX_VELOCITY:
+        raise ValueError("velocity must be between 0 and %g km/s" % MAX_VELOCITY)
+    return int(velocity) if velocity.is_integer() else velocity
+
+def freeze_key(value):
+    # JSON round-trips turn the tuples inside cache keys into lists
+    return tuple(freeze_key(item) for item in value) if isinstance(value, list) else value
+
+class ScenarioCache:
+    def __init__(self, max_entries=4096, snapshot_path=None):
+        self.max_entries = max_entries
+        self.snapshot_path = snapshot_path
+        self.entries = OrderedDict()
+        self.tags = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    # entries put with a tag (the data version they were computed from) are
+    # only returned to lookups carrying the same tag
+    def get(self, key, tag=None):
+        with self.lock:
+            body = self.entries.get(key)
+            if body is None or self.tags.get(key) != tag:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body, tag=None):
+        with self.lock:
+            self.entries[key] = body
+            self.entries.move_to_end(key)
+            self.tags[key] = tag
+            while len(self.entries) > self.max_entries:
+                self.tags.pop(self.entries.popitem(last=False)[0], None)
+
+    def retag(self, old_tag, new_tag, keep):
+        # carry entries whose inputs did not change over to the new tag, drop the rest
+        with self.lock:
+            stale = [key for key, tag in self.tags.items() if tag == old_tag]
+        dropped = 0
+        for key in stale:
+            still_valid = keep(key)
+            with self.lock:
+                if self.tags.get(key) != old_tag:
+                    continue
+                if still_valid:
+                    self.tags[key] = new_tag
+                else:
+                    del self.entries[key], self.tags[key]
+                    dropped += 1
+        return {"retagged": len(stale) - dropped, "dropped": dropped}
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.tags.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def save(self, path=None):
+        path = path or self.snapshot_path
+        if not path:
+            return
+        with self.lock:
+            items = [[key, body.decode('utf-8'), self.tags.get(key)] for key, body in self.entries.items()]
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(items, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path=None, tag=None):
+        path = path or self.snapshot_path
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, encoding='utf-8') as f:
+                items = json.load(f)
+        except (OSError, ValueError):
+            return
+        items = [item for item in items if len(item) == 3 and item[2] == tag]
+        for key, body, _ in items[-self.max_entries:]:
+            self.put(freeze_key(key), body.encode('utf-8'), tag)
+
+GRAVITY_M_S2 = 9.81
+TARGET_DENSITY = 2500.0
+SIMPLE_COMPLEX_CRATER_M = 3200.0
+LUMINOUS_EFFICIENCY = 3e-3
+# thermal exposure thresholds at 1 Mt, in J/m²; they scale with E^(1/6)
+THERMAL_THRESHOLDS = {"clothing_ignition": 1.0e6, "third_degree_burns": 4.2e5, "second_degree_burns": 2.5e5}
+EFFECT_FIELDS = ('blast', 'contours', 'thermal', 'seismic', 'crater', 'ejecta')
+DEFAULT_FIELDS = ('blast',)
+DEFAULT_CONTOUR_ZOOM = 9
+MAX_CONTOUR_ZOOM = 18
+
+class SingleFlight:
+    def __init__(self):
+        self.calls = {}
+        self.shared = 0
+        self.lock = threading.Lock()
+
+    def do(self, key, function):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = {"done": threading.Event(), "value": None, "error": None}
+            else:
+                self.shared += 1
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["value"]
+        try:
+            call["value"] = function()
+            return call["value"]
+        except Exception as error:
+            call["error"] = error
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call["done"].set()
+
+class GraphNode:
+    def __init__(self, name, function, dependencies, input_names, max_entries):
+        self.name = name
+        self.function = function
+        self.dependencies = dependencies
+        self.input_names = input_names
+        self.memo = ScenarioCache(max_entries=max_entries)
+
+class ComputationGraph:
+    def __init__(self, max_entries_per_node=4096):
+        self.nodes = {}
+        self.max_entries_per_node = max_entries_per_node
+
+    def node(self, *dependencies):
+        def register(function):
+            input_names = set()
+            for dependency in dependencies:
+                if dependency in self.nodes:
+                    input_names.update(self.nodes[dependency].input_names)
+                else:
+                    input_names.add(dependency)
+            self.nodes[function.__name__] = GraphNode(
+                function.__name__, function, dependencies, tuple(sorted(input_names)), self.max_entries_per_node
+            )
+            return function
+        return register
+
+    def evaluate(self, name, inputs):
+        node = self.nodes[name]
+        # memo key is only the inputs this node transitively depends on
+        key = tuple(inputs[input_name] for input_name in node.input_names)
+        cached = node.memo.get(key)
+        if cached is not None:
+            return cached[0]
+        value = node.function(*(
+            self.evaluate(dependency, inputs) if dependency in self.nodes else inputs[dependency]
+            for dependency in node.dependencies
+        ))
+        node.memo.put(key, (value,))
+        return value
+
+    def stats(self):
+        return {name: node.memo.stats() for name, node in self.nodes.items()}
+
+    def clear(self):
+        for node in self.nodes.values():
+            node.memo.clear()
+
+scenario_graph = ComputationGraph(max_entries_per_node=int(os.environ.get('GRAPH_CACHE_SIZE', 4096)))
+
+@scenario_graph.node('diameter_km')
+def radius_m(diameter_km):
+    return (diameter_km * 1000) / 2
+
+@scenario_graph.node('radius_m')
+def volume_m3(radius_m):
+    return (4/3) * math.pi * (radius_m ** 3)
+
+@scenario_graph.node('volume_m3', 'density')
+def mass_kg(volume_m3, density):
+    return volume_m3 * density
+
+@scenario_graph.node('mass_kg', 'velocity')
+def energy_joules(mass_kg, velocity):
+    velocity_m_s = velocity * 1000
+    return 0.5 * mass_kg * (velocity_m_s ** 2)
+
+@scenario_graph.node('energy_joules')
+def energy_megatons(energy_joules):
+    return energy_joules / MEGATON_J
+
+@scenario_graph.node('diameter_km', 'density', 'velocity', 'angle')
+def entry(diameter_km, density, velocity, angle):
+    if angle is None:
+        return None
+    return entry_outcomes([(diameter_km, density, velocity, angle)])[0]
+
+@scenario_graph.node('energy_megatons', 'entry', 'burst')
+def blast(energy_megatons, entry, burst):
+    if entry is None:
+        return energy_megatons, burst, 0.0
+    return entry_blast(entry)
+
+@scenario_graph.node('blast')
+def severe_radius_km(blast):
+    return calculate_psi_radius(blast[0], 20, blast[1], blast[2])
+
+@scenario_graph.node('blast')
+def moderate_radius_km(blast):
+    return calculate_psi_radius(blast[0], 3, blast[1], blast[2])
+
+@scenario_graph.node('severe_radius_km', 'lat', 'lon', 'population')
+def severe_affected(severe_radius_km, lat, lon, population):
+    return estimate_affected_population(severe_radius_km, {"lat": lat, "lon": lon, "population": population})
+
+@scenario_graph.node('moderate_radius_km', 'lat', 'lon', 'population')
+def moderate_affected(moderate_radius_km, lat, lon, population):
+    return estimate_affected_population(moderate_radius_km, {"lat": lat, "lon": lon, "population": population})
+
+@scenario_graph.node('severe_radius_km', 'moderate_radius_km', 'lat', 'lon', 'zoom')
+def damage_contours(severe_radius_km, moderate_radius_km, lat, lon, zoom):
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"zone": zone, "psi": psi, "radius_km": round(radius_km, 2)},
+                "geometry": {"type": "Polygon", "coordinates": contour_polygon(lat, lon, radius_km, zoom)}
+            }
+            for zone, psi, radius_km in (("moderate", 3, moderate_radius_km), ("severe", 20, severe_radius_km))
+        ]
+    }
+
+@scenario_graph.node('energy_joules', 'entry')
+def ground_energy_joules(energy_joules, entry):
+    if entry is None:
+        return energy_joules
+    return entry["ground_energy_megatons"] * MEGATON_J
+
+@scenario_graph.node('ground_energy_joules', 'mass_kg', 'radius_m', 'density', 'angle')
+def transient_crater_m(ground_energy_joules, mass_kg, radius_m, density, angle):
+    if ground_energy_joules <= 0:
+        return 0.0
+    # Collins et al. (2005) pi-scaling with the velocity left at the ground
+    velocity_m_s = math.sqrt(2 * ground_energy_joules / mass_kg)
+    angle = DEFAULT_IMPACT_ANGLE if angle is None else angle
+    return (1.161 * (density / TARGET_DENSITY) ** (1/3) * (2 * radius_m) ** 0.78
+            * velocity_m_s ** 0.44 * GRAVITY_M_S2 ** -0.22 * math.sin(math.radians(angle)) ** (1/3))
+
+class Scenario:
+    def __init__(self, asteroid, location, velocity, burst='surface', angle=None, zoom=DEFAULT_CONTOUR_ZOOM):
+        self.asteroid = asteroid
+        self.location = location
+        self.inputs = {
+            "diameter_km": asteroid['diameter_km'],
+            "density": asteroid['density'],
+            "velocity": velocity,
+            "angle": angle,
+            "burst": burst,
+            "lat": location['lat'],
+            "lon": location['lon'],
+            "population": location['population'],
+            "zoom": zoom
+        }
+
+    def __getattr__(self, name):
+        if name in scenario_graph.nodes:
+            return scenario_graph.evaluate(name, self.inputs)
+        raise AttributeError(name)
+
+def blast_effects(scenario, psi_values=None):
+    blast_energy_mt, burst, burst_height_km = scenario.blast
     
-    if asteroid_name not in ASTEROIDS:
-        return jsonify({"error": "Invalid asteroid"}), 400
+    fields = {
+        "damage_zones": {
+            "severe": {
+                "psi": 20,
+                "radius_km": round(scenario.severe_radius_km, 2),
+                "description": "Total building collapse, near 100% casualties",
+                "estimated_affected": scenario.severe_affected
+            },
+            "moderate": {
+                "psi": 3,
+                "radius_km": round(scenario.moderate_radius_km, 2),
+                "description": "Severe structural damage, glass shattering, ~50% casualties",
+                "estimated_affected": scenario.moderate_affected
+            }
+        }
+    }
     
-    if location_name not in LOCATIONS:
-        return jsonify({"error": "Invalid location"}), 400
+    if psi_values or scenario.entry is not None:
+        fields["burst"] = burst
     
+    if psi_values:
+        radii = calculate_psi_radius_np(blast_energy_mt, psi_values, burst, burst_height_km)
+        fields["psi_zones"] = [
+            {
+                "psi": psi,
+                "radius_km": round(float(radius_km), 2),
+                "estimated_affected": estimate_affected_population(float(radius_km), scenario.location)
+            }
+            for psi, radius_km in zip(psi_values, radii)
+        ]
+    return fields
+
+def contour_effects(scenario, psi_values=None):
+    return {"damage_geojson": scenario.damage_contours}
+
+def thermal_effects(scenario, psi_values=None):
+    blast_energy_mt, _, _ = scenario.blast
+    energy_joules = blast_energy_mt * MEGATON_J
+    radiated = LUMINOUS_EFFICIENCY * energy_joules
+    thermal = {"fireball_radius_km": round(0.002 * energy_joules ** (1/3) / 1000, 2)}
+    for name, threshold in THERMAL_THRESHOLDS.items():
+        exposure = threshold * blast_energy_mt ** (1/6)
+        thermal[name + "_radius_km"] = round(math.sqrt(radiated / (2 * math.pi * exposure)) / 1000, 2) if exposure > 0 else 0.0
+    return {"thermal": thermal}
+
+def seismic_effects(scenario, psi_values=None):
+    if scenario.ground_energy_joules <= 0:
+        return {"seismic": {"magnitude": None}}
+    return {"seismic": {"magnitude": round(0.67 * math.log10(scenario.ground_energy_joules) - 5.87, 1)}}
+
+def crater_effects(scenario, psi_values=None):
+    transient_m = scenario.transient_crater_m
+    if transient_m * 1.25 < SIMPLE_COMPLEX_CRATER_M:
+        final_m, crater_type = transient_m * 1.25, "simple"
+    else:
+        final_m, crater_type = 1.17 * transient_m ** 1.13 / SIMPLE_COMPLEX_CRATER_M ** 0.13, "complex"
+    return {"crater": {
+        "type": crater_type if transient_m > 0 else None,
+        "transient_diameter_km": round(transient_m / 1000, 2),
+        "final_diameter_km": round(final_m / 1000, 2)
+    }}
+
+def ejecta_effects(scenario, psi_values=None):
+    # ejecta blanket thickness t = D_tc^4 / (112 r^3)
+    transient_m = scenario.transient_crater_m
+    return {"ejecta": {
+        "radius_1m_km": round((transient_m ** 4 / (112 * 1.0)) ** (1/3) / 1000, 2),
+        "radius_10cm_km": round((transient_m ** 4 / (112 * 0.1)) ** (1/3) / 1000, 2)
+    }}
+
+EFFECT_STAGES = {
+    'blast': blast_effects,
+    'contours': contour_effects,
+    'thermal': thermal_effects,
+    'seismic': seismic_effects,
+    'crater': crater_effects,
+    'ejecta': ejecta_effects
+}
+
+def parse_fields(value):
+    if not value:
+        return DEFAULT_FIELDS
+    if isinstance(value, str):
+        value = value.split(',')
+    requested = {str(field).strip() for field in value}
+    if not requested <= set(EFFECT_FIELDS):
+        raise ValueError("unknown fields: %s" % ', '.join(sorted(requested - set(EFFECT_FIELDS))))
+    return tuple(field for field in EFFECT_FIELDS if field in requested)
+
+def compute_scenario(asteroid_name, location_name, velocity, psi_values=None, burst='surface', angle=None,
+                     fields=DEFAULT_FIELDS, zoom=DEFAULT_CONTOUR_ZOOM):
     asteroid = ASTEROIDS[asteroid_name]
     location = LOCATIONS[location_name]
-    
-    energy_mt = calculate_impact_energy(
-        asteroid['diameter_km'],
-        velocity,
-        asteroid['density']
-    )
-    
-    radius_20_psi = calculate_psi_radius(energy_mt, 20)
-    radius_3_psi = calculate_psi_radius(energy_mt, 3)
-    
-    affected_severe = estimate_affected_population(radius_20_psi, location)
-    affected_moderate = estimate_affected_population(radius_3_psi, location)
+    scenario = Scenario(asteroid, location, velocity, burst, angle, zoom)
     
     result = {
         "asteroid": asteroid_name,
@@ -1682,26 +1754,1226 @@ def simulate_impact():
             "lon": location['lon']
         },
         "velocity_km_s": velocity,
-        "energy_megatons": round(energy_mt, 2),
-        "damage_zones": {
-            "severe": {
-                "psi": 20,
-                "radius_km": round(radius_20_psi, 2),
-                "description": "Total building collapse, near 100% casualties",
-                "estimated_affected": affected_severe
-            },
-            "moderate": {
-                "psi": 3,
-                "radius_km": round(radius_3_psi, 2),
-                "description": "Severe structural damage, glass shattering, ~50% casualties",
-                "estimated_affected": affected_moderate
+        "energy_megatons": round(scenario.energy_megatons, 2)
+    }
+    
+    for field in fields:
+        result.update(EFFECT_STAGES[field](scenario, psi_values))
+    
+    if scenario.entry is not None:
+        result["impact_angle_deg"] = angle
+        result["entry"] = dict(
+            scenario.entry,
+            energy_deposited_megatons=round(scenario.entry["energy_deposited_megatons"], 2),
+            ground_energy_megatons=round(scenario.entry["ground_energy_megatons"], 2)
+        )
+    
+    return result
+
+scenario_cache = ScenarioCache(
+    max_entries=int(os.environ.get('SCENARIO_CACHE_SIZE', 4096)),
+    snapshot_path=os.environ.get('SCENARIO_CACHE_PATH')
+)
+scenario_cache.load(tag=DATA_VERSION)
+atexit.register(scenario_cache.save)
+entry_cache = ScenarioCache(max_entries=int(os.environ.get('ENTRY_CACHE_SIZE', 65536)))
+
+COMPUTE_WORKERS = int(os.environ.get('COMPUTE_WORKERS', os.cpu_count() or 1))
+COMPUTE_QUEUE_DEPTH = int(os.environ.get('COMPUTE_QUEUE_DEPTH', 4 * max(COMPUTE_WORKERS, 1)))
+
+class ComputeOverloaded(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Simulation queue is full, retry in %d s" % retry_after)
+        self.retry_after = retry_after
+
+def init_compute_worker():
+    # children inherit the server's signal handlers; they should just die with it
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGQUIT, signal.SIGUSR1, signal.SIGUSR2):
+        signal.signal(signum, signal.SIG_DFL)
+    parent = os.getppid()
+    # the child blocks in plain pipe reads, where a green thread forked from a
+    # gevent worker would never run, so the watch uses a native thread
+    start_new_thread, sleep = _thread.start_new_thread, time.sleep
+    if gevent is not None:
+        start_new_thread = gevent.monkey.get_original('_thread', 'start_new_thread')
+        sleep = gevent.monkey.get_original('time', 'sleep')
+    def watch_parent():
+        while os.getppid() == parent:
+            sleep(1.0)
+        os._exit(0)
+    start_new_thread(watch_parent, ())
+    # memos forked from the server stay warm; only one caught mid-update (its lock
+    # held by a thread that doesn't exist here) has to be dropped
+    for cache in [scenario_cache, entry_cache] + [node.memo for node in scenario_graph.nodes.values()]:
+        held = cache.lock.locked()
+        cache.lock = threading.Lock()
+        if held:
+            cache.clear()
+    ASTEROIDS.lock = threading.Lock()
+    LOCATIONS.lock = threading.Lock()
+
+def run_compute_task(function, args):
+    with app.app_context():
+        return jsonify(function(*args)).get_data()
+
+# Heavy models (Monte Carlo, batch, multi-city, atmospheric entry, raster
+# population) run in forked worker processes so they can't starve the request
+# threads of the GIL; plain blast scenarios are cheap and stay inline. At most
+# max_pending heavy tasks may be queued or running; past that, callers get
+# ComputeOverloaded instead of waiting in an unbounded queue.
+class ComputePool:
+    def __init__(self, workers, max_pending):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.average_s = 0.1
+        self.executor = None
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def submit(self, function, args):
+        with self.lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise ComputeOverloaded(max(1, math.ceil(self.average_s)))
+            future = self.own_executor().submit(run_compute_task, function, args)
+            self.pending += 1
+            return future
+
+    # called with the lock held
+    def own_executor(self):
+        if self.executor is None or self.pid != os.getpid():
+            self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('fork'),
+                                                initializer=init_compute_worker)
+            self.pid = os.getpid()
+        return self.executor
+
+    # A fork-context pool forks all of its processes on the first task. Running
+    # a no-op task before the worker serves keeps that fork out of requests.
+    def start(self):
+        if self.workers <= 0:
+            return
+        with self.lock:
+            executor = self.own_executor()
+        executor.submit(os.getpid).result()
+
+    def run(self, function, *args):
+        if self.workers <= 0:
+            return run_compute_task(function, args)
+        start = time.perf_counter()
+        future = self.submit(function, args)
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            self.reset()
+            raise
+        finally:
+            with self.lock:
+                self.pending -= 1
+                self.completed += 1
+                self.average_s += 0.2 * (time.perf_counter() - start - self.average_s)
+
+    # new tasks go to freshly forked workers, e.g. after the catalogs are swapped
+    def reset(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+            owned = self.pid == os.getpid()
+        if executor is not None and owned:
+            executor.shutdown(wait=False)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "pending": self.pending,
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "average_ms": round(self.average_s * 1000, 1)
             }
+
+compute_pool = ComputePool(COMPUTE_WORKERS, COMPUTE_QUEUE_DEPTH)
+
+@app.errorhandler(ComputeOverloaded)
+def compute_overloaded(error):
+    response = jsonify({"error": str(error)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+@app.route('/api/simulate', methods=['POST'])
+def simulate_impact():
+    data = request.json
+    
+    asteroid_name = data.get('asteroid')
+    location_name = data.get('location')
+    
+    if asteroid_name not in ASTEROIDS:
+        return jsonify({"error": "Invalid asteroid"}), 400
+    
+    if location_name not in LOCATIONS:
+        return jsonify({"error": "Invalid location"}), 400
+    
+    try:
+        velocity = normalize_velocity(data.get('velocity'))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid velocity (expected 0 < velocity <= %g km/s)" % MAX_VELOCITY}), 400
+    
+    if data.get('mode') == 'monte_carlo':
+        return simulate_monte_carlo(asteroid_name, location_name, velocity, data)
+    
+    if data.get('mode') == 'multi_city':
+        return simulate_multi_city(asteroid_name, location_name, velocity)
+    
+    try:
+        key = scenario_key(asteroid_name, location_name, velocity, data)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+    
+    return app.response_class(scenario_body(key), mimetype='application/json')
+
+def scenario_key(asteroid_name, location_name, velocity, data):
+    burst = data.get('burst', 'surface')
+    if burst not in BURST_TYPES:
+        raise ValueError("Invalid burst type")
+    
+    try:
+        psi_values = tuple(float(psi) for psi in data.get('psi') or ())
+        scaled_psi_distance(psi_values, burst)
+    except (TypeError, ValueError):
+        raise ValueError("psi must be a list of values between %g and %g" % (MIN_PSI, MAX_PSI))
+    
+    angle = None
+    if data.get('entry'):
+        try:
+            angle = float(data.get('angle', DEFAULT_IMPACT_ANGLE))
+        except (TypeError, ValueError):
+            angle = -1.0
+        if not 5.0 <= angle <= 90.0:
+            raise ValueError("angle must be between 5 and 90 degrees")
+        if not MIN_ENTRY_VELOCITY <= velocity <= MAX_ENTRY_VELOCITY:
+            raise ValueError("velocity must be between %g and %g km/s for atmospheric entry" % (MIN_ENTRY_VELOCITY, MAX_ENTRY_VELOCITY))
+    
+    try:
+        fields = parse_fields(data.get('fields'))
+    except ValueError:
+        raise ValueError("fields must be a subset of %s" % ', '.join(EFFECT_FIELDS))
+    
+    try:
+        zoom = int(data.get('zoom', DEFAULT_CONTOUR_ZOOM))
+    except (TypeError, ValueError):
+        zoom = -1
+    if not 0 <= zoom <= MAX_CONTOUR_ZOOM:
+        raise ValueError("zoom must be between 0 and %d" % MAX_CONTOUR_ZOOM)
+    if 'contours' not in fields:
+        zoom = None
+    
+    return (asteroid_name, location_name, velocity, psi_values, burst, angle, fields, zoom)
+
+scenario_flights = SingleFlight()
+
+# Concurrent misses on the same key wait for one computation and share its bytes
+def cached_body(key, function, *args, heavy=True):
+    version = DATA_VERSION
+    body = scenario_cache.get(key, version)
+    if body is None:
+        def run():
+            body = compute_pool.run(function, *args) if heavy else run_compute_task(function, args)
+            scenario_cache.put(key, body, version)
+            return body
+        body = scenario_flights.do((version, key), run)
+    return body
+
+def scenario_body(key):
+    angle = key[5]
+    return cached_body(key, compute_scenario, *key, heavy=angle is not None or POPULATION_RASTER is not None)
+
+# int() would quietly truncate 1.9 samples to 1
+def integer_param(value):
+    if isinstance(value, bool) or isinstance(value, float) and not value.is_integer():
+        raise ValueError("not an integer")
+    return int(value)
+
+def simulate_monte_carlo(asteroid_name, location_name, velocity, data):
+    try:
+        samples = integer_param(data.get('samples', MONTE_CARLO_DEFAULT_SAMPLES))
+        seed = integer_param(data.get('seed', 0))
+        uncertainties = {
+            name: float(data[name])
+            for name in ('diameter_uncertainty', 'density_uncertainty', 'velocity_uncertainty')
+            if name in data
+        }
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid Monte Carlo parameters"}), 400
+    
+    if not 1 <= samples <= MONTE_CARLO_MAX_SAMPLES:
+        return jsonify({"error": "samples must be between 1 and %d" % MONTE_CARLO_MAX_SAMPLES}), 400
+    
+    if seed < 0:
+        return jsonify({"error": "seed must be a non-negative integer"}), 400
+    
+    if any(not 0 <= u <= 1 for u in uncertainties.values()):
+        return jsonify({"error": "Uncertainties must be between 0 and 1"}), 400
+    
+    key = ('monte_carlo', asteroid_name, location_name, velocity, samples, seed) + tuple(sorted(uncertainties.items()))
+    body = cached_body(key, monte_carlo_result, asteroid_name, location_name, velocity, samples, seed, uncertainties)
+    return app.response_class(body, mimetype='application/json')
+
+def monte_carlo_result(asteroid_name, location_name, velocity, samples, seed, uncertainties):
+    return {
+        "asteroid": asteroid_name,
+        "location": location_name,
+        "velocity_km_s": velocity,
+        "mode": "monte_carlo",
+        "samples": samples,
+        "seed": seed,
+        "percentiles": run_monte_carlo(
+            ASTEROIDS[asteroid_name], LOCATIONS[location_name], velocity, samples, seed, **uncertainties
+        )
+    }
+
+MAX_CITY_BREAKDOWN = 100
+
+def aggregate_city_impacts(location, damage_zones):
+    search_radius_km = max(zone['radius_km'] for zone in damage_zones.values()) + CITY_RADIUS_KM
+    rows, distance_km = LOCATIONS.cities_within(location['lat'], location['lon'], search_radius_km)
+    keep = ~LOCATIONS.metro_rows_covered(rows)
+    rows, distance_km = rows[keep], distance_km[keep]
+    population = LOCATIONS.population[rows]
+
+    affected = {
+        zone_name: estimate_affected_population_multi(zone['radius_km'], population, distance_km)
+        for zone_name, zone in damage_zones.items()
+    }
+    total = sum(affected.values())
+    order = np.argsort(-total, kind='stable')
+    order = order[total[order] > 0]
+
+    return {
+        "totals": {zone_name: int(values.sum()) for zone_name, values in affected.items()},
+        "city_count": int(order.size),
+        "cities": [
+            dict(
+                name=LOCATIONS.names[rows[i]],
+                country=LOCATIONS.countries[LOCATIONS.country_code[rows[i]]],
+                distance_km=round(float(distance_km[i]), 1),
+                **{zone_name + "_affected": int(values[i]) for zone_name, values in affected.items()}
+            )
+            for i in order[:MAX_CITY_BREAKDOWN]
+        ]
+    }
+
+def simulate_multi_city(asteroid_name, location_name, velocity):
+    key = ('multi_city', asteroid_name, location_name, velocity)
+    body = cached_body(key, multi_city_result, asteroid_name, location_name, velocity)
+    return app.response_class(body, mimetype='application/json')
+
+def multi_city_result(asteroid_name, location_name, velocity):
+    result = compute_scenario(asteroid_name, location_name, velocity)
+    result["mode"] = "multi_city"
+    result["affected_cities"] = aggregate_city_impacts(LOCATIONS[location_name], result["damage_zones"])
+    return result
+
+# Live slider positions travel over one WebSocket per page: the page sends each
+# position and the server answers only the newest, skipping any that were
+# overtaken while it computed. serve() runs gevent workers, so an idle socket
+# costs a greenlet rather than a server thread.
+STREAM_KEEPALIVE_S = 15
+stream_counts = {"open": 0, "results": 0, "dropped": 0}
+stream_counts_lock = threading.Lock()
+
+def count_stream(name, delta=1):
+    with stream_counts_lock:
+        stream_counts[name] += delta
+
+def stream_position(message):
+    try:
+        data = json.loads(message)
+        seq = int(data.get('seq'))
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError("Expected a JSON object with an integer seq")
+    
+    if data.get('asteroid') not in ASTEROIDS:
+        raise ValueError("Invalid asteroid")
+    
+    if data.get('location') not in LOCATIONS:
+        raise ValueError("Invalid location")
+    
+    try:
+        velocity = normalize_velocity(data.get('velocity'))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid velocity (expected 0 < velocity <= %g km/s)" % MAX_VELOCITY)
+    
+    return seq, scenario_key(data['asteroid'], data['location'], velocity, data)
+
+def latest_message(ws, message):
+    # positions that queued up behind the one being computed are superseded
+    while True:
+        newer = ws.receive(timeout=0)
+        if newer is None:
+            return message
+        count_stream('dropped')
+        message = newer
+
+if Sock is not None:
+    app.config.setdefault('SOCK_SERVER_OPTIONS', {'ping_interval': STREAM_KEEPALIVE_S})
+    sock = Sock(app)
+
+    @sock.route('/api/stream')
+    def scenario_stream(ws):
+        count_stream('open')
+        try:
+            message = ws.receive()
+            while message is not None:
+                message = latest_message(ws, message)
+                try:
+                    seq, key = stream_position(message)
+                except ValueError as error:
+                    ws.send(json.dumps({"type": "error", "error": str(error)}))
+                    message = ws.receive()
+                    continue
+                try:
+                    body = scenario_body(key)
+                except ComputeOverloaded as error:
+                    ws.send(json.dumps({"type": "busy", "seq": seq, "retry_after": error.retry_after}))
+                    message = ws.receive()
+                    continue
+                newer = ws.receive(timeout=0)
+                if newer is not None:
+                    count_stream('dropped')
+                    message = newer
+                    continue
+                ws.send('{"type":"result","seq":%d,"result":%s}' % (seq, body.decode('utf-8')))
+                count_stream('results')
+                message = ws.receive()
+        except ConnectionClosed:
+            pass
+        finally:
+            count_stream('open', -1)
+
+@app.route('/api/stream/stats')
+def stream_stats():
+    with stream_counts_lock:
+        return jsonify(dict(stream_counts, enabled=Sock is not None))
+
+@app.route('/api/compute/stats')
+def compute_stats():
+    return jsonify(compute_pool.stats())
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    return jsonify(dict(scenario_cache.stats(), coalesced=scenario_flights.shared))
+
+@app.route('/api/graph/stats')
+def graph_stats():
+    return jsonify(scenario_graph.stats())
+
+# rows serialize to 60-70 bytes, so a full batch is about 6 MB; the byte limit
+# caps the response whatever shape the rows take
+MAX_BATCH_SCENARIOS = 100000
+MAX_BATCH_RESPONSE_BYTES = 8 << 20
+MAX_BATCH_ENTRY_BODIES = 10000
+
+@app.route('/api/simulate/batch', methods=['POST'])
+def simulate_batch():
+    data = request.json or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+
+    asteroid_names = data.get('asteroids') or list(ASTEROIDS.featured)
+    location_names = data.get('locations') or list(LOCATIONS.featured)
+    velocities = data.get('velocities') or [40]
+
+    if not isinstance(asteroid_names, list) or not all(isinstance(name, str) for name in asteroid_names):
+        return jsonify({"error": "asteroids must be a list of names"}), 400
+
+    if not isinstance(location_names, list) or not all(isinstance(name, str) for name in location_names):
+        return jsonify({"error": "locations must be a list of names"}), 400
+
+    if not isinstance(velocities, list) or not all(
+        isinstance(velocity, (int, float)) and not isinstance(velocity, bool) and 0 < velocity <= MAX_VELOCITY
+        for velocity in velocities
+    ):
+        return jsonify({"error": "velocities must be a list of numbers between 0 and %g km/s" % MAX_VELOCITY}), 400
+
+    for name in asteroid_names:
+        if name not in ASTEROIDS:
+            return jsonify({"error": "Invalid asteroid: %s" % name}), 400
+
+    for name in location_names:
+        if name not in LOCATIONS:
+            return jsonify({"error": "Invalid location: %s" % name}), 400
+
+    try:
+        velocity_axis = np.asarray(velocities, dtype=np.float64).ravel()
+        angle = float(data.get('angle', DEFAULT_IMPACT_ANGLE)) if data.get('entry') else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid velocities or angle"}), 400
+
+    if angle is not None and not 5.0 <= angle <= 90.0:
+        return jsonify({"error": "angle must be between 5 and 90 degrees"}), 400
+
+    count = len(asteroid_names) * len(location_names) * velocity_axis.size
+    if count > MAX_BATCH_SCENARIOS:
+        return jsonify({"error": "Too many scenarios (max %d)" % MAX_BATCH_SCENARIOS}), 400
+
+    if angle is not None:
+        if not np.all((velocity_axis >= MIN_ENTRY_VELOCITY) & (velocity_axis <= MAX_ENTRY_VELOCITY)):
+            return jsonify({"error": "velocities must be between %g and %g km/s for atmospheric entry" % (MIN_ENTRY_VELOCITY, MAX_ENTRY_VELOCITY)}), 400
+        # each distinct asteroid and velocity is integrated through the atmosphere once
+        if len(set(asteroid_names)) * np.unique(velocity_axis).size > MAX_BATCH_ENTRY_BODIES:
+            return jsonify({"error": "Too many entry scenarios (max %d asteroid and velocity pairs)" % MAX_BATCH_ENTRY_BODIES}), 400
+
+    body = compute_pool.run(batch_result, asteroid_names, location_names, velocity_axis, angle)
+    if len(body) > MAX_BATCH_RESPONSE_BYTES:
+        return jsonify({"error": "Batch result too large (%d bytes, max %d); request fewer scenarios" % (len(body), MAX_BATCH_RESPONSE_BYTES)}), 400
+    return app.response_class(body, mimetype='application/json')
+
+def batch_result(asteroid_names, location_names, velocity_axis, angle):
+    count = len(asteroid_names) * len(location_names) * velocity_axis.size
+    diameters = np.array([ASTEROIDS[a]['diameter_km'] for a in asteroid_names], dtype=np.float64)
+    densities = np.array([ASTEROIDS[a]['density'] for a in asteroid_names], dtype=np.float64)
+    populations = np.array([LOCATIONS[l]['population'] for l in location_names], dtype=np.float64)
+
+    # grid axes: (asteroid, location, velocity), flattened in C order
+    energy_mt = calculate_impact_energy_np(
+        diameters[:, None, None],
+        velocity_axis[None, None, :],
+        densities[:, None, None]
+    )
+    energy_mt = np.broadcast_to(energy_mt, (len(asteroid_names), len(location_names), velocity_axis.size))
+
+    blast_energy_mt = energy_mt
+    airburst_altitude = None
+    if angle is not None:
+        scenarios = [(d, rho, v, angle) for d, rho in zip(diameters, densities) for v in velocity_axis]
+        outcomes = entry_outcomes(scenarios)
+        blasts = [entry_blast(outcome) for outcome in outcomes]
+        shape = (len(asteroid_names), 1, velocity_axis.size)
+        blast_energy_mt = np.array([energy for energy, _, _ in blasts]).reshape(shape)
+        is_airburst = np.array([burst == 'airburst' for _, burst, _ in blasts]).reshape(shape)
+        burst_height_km = np.array([height for _, _, height in blasts]).reshape(shape)
+        airburst_altitude = np.array([
+            np.nan if outcome["airburst_altitude_km"] is None else outcome["airburst_altitude_km"]
+            for outcome in outcomes
+        ]).reshape(shape)
+        airburst_altitude = np.broadcast_to(airburst_altitude, energy_mt.shape)
+
+        radius_20_psi = np.where(is_airburst,
+                                 calculate_psi_radius_np(blast_energy_mt, 20, 'airburst', burst_height_km),
+                                 calculate_psi_radius_np(blast_energy_mt, 20, 'surface'))
+        radius_3_psi = np.where(is_airburst,
+                                calculate_psi_radius_np(blast_energy_mt, 3, 'airburst', burst_height_km),
+                                calculate_psi_radius_np(blast_energy_mt, 3, 'surface'))
+        radius_20_psi = np.broadcast_to(radius_20_psi, energy_mt.shape)
+        radius_3_psi = np.broadcast_to(radius_3_psi, energy_mt.shape)
+    else:
+        radius_20_psi = calculate_psi_radius_np(energy_mt, 20)
+        radius_3_psi = calculate_psi_radius_np(energy_mt, 3)
+
+    affected_severe = estimate_affected_population_np(radius_20_psi, populations[None, :, None])
+    affected_moderate = estimate_affected_population_np(radius_3_psi, populations[None, :, None])
+
+    a_idx, l_idx, v_idx = np.indices(energy_mt.shape).reshape(3, -1)
+
+    result = {
+        "count": int(count),
+        "asteroids": asteroid_names,
+        "locations": location_names,
+        "velocities": velocity_axis.tolist(),
+        "columns": {
+            "asteroid": a_idx.tolist(),
+            "location": l_idx.tolist(),
+            "velocity_km_s": velocity_axis[v_idx].tolist(),
+            "energy_megatons": np.round(energy_mt, 2).ravel().tolist(),
+            "severe_radius_km": np.round(radius_20_psi, 2).ravel().tolist(),
+            "severe_affected": affected_severe.ravel().tolist(),
+            "moderate_radius_km": np.round(radius_3_psi, 2).ravel().tolist(),
+            "moderate_affected": affected_moderate.ravel().tolist()
         }
     }
+
+    if airburst_altitude is not None:
+        result["impact_angle_deg"] = angle
+        result["columns"]["airburst_altitude_km"] = [
+            None if np.isnan(h) else h for h in airburst_altitude.ravel().tolist()
+        ]
+
+    return result
+
+RISK_TILE_DIR = os.environ.get('RISK_TILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tiles', 'risk'))
+RISK_GRID_DEG = 0.25
+RISK_MAX_ZOOM = 5
+RISK_VELOCITY = 20
+TILE_SIZE = 256
+
+def encode_png(rgba):
+    height, width, _ = rgba.shape
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgba.reshape(height, width * 4)
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw.tobytes(), 6))
+            + chunk(b'IEND', b''))
+
+EMPTY_TILE_PNG = encode_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+
+def tile_slug(name):
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', name).strip('_')
+
+def population_grid(cell_deg):
+    nrows, ncols = int(round(180 / cell_deg)), int(round(360 / cell_deg))
+    if POPULATION_RASTER is not None:
+        # exact block sums straight from the summed-area table
+        raster = POPULATION_RASTER
+        row_edges = np.clip(np.round((raster.ymax - (90 - np.arange(nrows + 1) * cell_deg)) / raster.cellsize), 0, raster.nrows).astype(np.int64)
+        col_edges = np.clip(np.round((-180 + np.arange(ncols + 1) * cell_deg - raster.xllcorner) / raster.cellsize), 0, raster.ncols).astype(np.int64)
+        S = np.asarray(raster.sat[np.ix_(row_edges, col_edges)])
+        return S[1:, 1:] - S[:-1, 1:] - S[1:, :-1] + S[:-1, :-1]
+    grid, _, _ = np.histogram2d(
+        90 - LOCATIONS.lat, LOCATIONS.lon + 180,
+        bins=(nrows, ncols), range=((0, 180), (0, 360)),
+        weights=LOCATIONS.population.astype(np.float64)
+    )
+    return grid
+
+_risk_worker_state = {}
+
+def init_risk_worker(grid, cell_deg):
+    nrows, ncols = grid.shape
+    # each row tripled so longitude windows can wrap without branching
+    extended = np.zeros((nrows, 3 * ncols + 1))
+    np.cumsum(np.concatenate([grid, grid, grid], axis=1), axis=1, out=extended[:, 1:])
+    _risk_worker_state.update(extended=extended, row_totals=grid.sum(axis=1), cell_deg=cell_deg, shape=grid.shape)
+
+def disk_population_rows(rows, radius_km):
+    state = _risk_worker_state
+    extended, row_totals, cell_deg = state['extended'], state['row_totals'], state['cell_deg']
+    nrows, ncols = state['shape']
+    row_lat = 90 - (np.arange(nrows) + 0.5) * cell_deg
+    cols = np.arange(ncols)
+    band = int(math.ceil(radius_km / (KM_PER_DEGREE * cell_deg)))
+    sums = np.zeros((len(rows), ncols))
+    for n, i in enumerate(rows):
+        for k in range(max(i - band, 0), min(i + band, nrows - 1) + 1):
+            dy_km = (row_lat[k] - row_lat[i]) * KM_PER_DEGREE
+            if abs(dy_km) > radius_km:
+                continue
+            half_km = math.sqrt(radius_km ** 2 - dy_km ** 2)
+            half_cols = int(half_km / (KM_PER_DEGREE * cell_deg * max(math.cos(math.radians(row_lat[k])), 1e-6)))
+            if 2 * half_cols + 1 >= ncols:
+                sums[n] += row_totals[k]
+            else:
+                sums[n] += extended[k, cols + half_cols + ncols + 1] - extended[k, cols - half_cols + ncols]
+    return sums
+
+def risk_rows(task):
+    rows, severe_radius_km, moderate_radius_km = task
+    severe = disk_population_rows(rows, severe_radius_km)
+    moderate = disk_population_rows(rows, moderate_radius_km)
+    return rows[0], severe + 0.5 * (moderate - severe)
+
+def risk_colormap(casualties):
+    level = np.clip(np.log10(1 + casualties) / 8, 0, 1)
+    rgba = np.empty(casualties.shape + (4,), dtype=np.uint8)
+    rgba[..., 0] = 255
+    rgba[..., 1] = (220 * (1 - level)).astype(np.uint8)
+    rgba[..., 2] = 0
+    rgba[..., 3] = np.where(casualties >= 1, 60 + 160 * level, 0).astype(np.uint8)
+    return rgba
+
+def render_risk_tile(task):
+    z, x, y = task
+    state = _risk_worker_state
+    risk, cell_deg, out_dir = state['risk'], state['cell_deg'], state['out_dir']
+    nrows, ncols = risk.shape
+    pixel = (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE
+    lat = np.degrees(np.arctan(np.sinh(math.pi * (1 - 2 * (y + pixel) / 2 ** z))))
+    lon = (x + pixel) / 2 ** z * 360 - 180
+    rows = np.clip(((90 - lat) / cell_deg).astype(np.int64), 0, nrows - 1)
+    cols = np.clip(((lon + 180) / cell_deg).astype(np.int64), 0, ncols - 1)
+    casualties = risk[rows[:, None], cols[None, :]]
+    if not (casualties >= 1).any():
+        return 0
+    path = os.path.join(out_dir, str(z), str(x), '%d.png' % y)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(encode_png(risk_colormap(casualties)))
+    return 1
+
+def init_render_worker(risk, cell_deg, out_dir):
+    _risk_worker_state.update(risk=risk, cell_deg=cell_deg, out_dir=out_dir)
+
+def build_risk_tiles(asteroid_names, velocity=RISK_VELOCITY, max_zoom=RISK_MAX_ZOOM, cell_deg=RISK_GRID_DEG,
+                     workers=None, out_dir=RISK_TILE_DIR):
+    grid = population_grid(cell_deg)
+    nrows = grid.shape[0]
+    chunks = [np.arange(start, min(start + 8, nrows)) for start in range(0, nrows, 8)]
+    tiles = [(z, x, y) for z in range(max_zoom + 1) for x in range(2 ** z) for y in range(2 ** z)]
+
+    for name in asteroid_names:
+        asteroid = ASTEROIDS[name]
+        energy_mt = calculate_impact_energy(asteroid['diameter_km'], velocity, asteroid['density'])
+        severe_radius_km = calculate_psi_radius(energy_mt, 20)
+        moderate_radius_km = calculate_psi_radius(energy_mt, 3)
+
+        risk = np.zeros_like(grid)
+        with multiprocessing.Pool(workers, initializer=init_risk_worker, initargs=(grid, cell_deg)) as pool:
+            for start, values in pool.imap_unordered(risk_rows, [(rows, severe_radius_km, moderate_radius_km) for rows in chunks]):
+                risk[start:start + len(values)] = values
+
+        asteroid_dir = os.path.join(out_dir, tile_slug(name))
+        if os.path.isdir(asteroid_dir):
+            shutil.rmtree(asteroid_dir)
+        os.makedirs(asteroid_dir)
+        with multiprocessing.Pool(workers, initializer=init_render_worker, initargs=(risk, cell_deg, asteroid_dir)) as pool:
+            written = sum(pool.imap_unordered(render_risk_tile, tiles, chunksize=16))
+        print("%s: %d tiles written to %s" % (name, written, asteroid_dir))
+
+@app.route('/tiles/risk/<asteroid>/<int:z>/<int:x>/<int:y>.png')
+def risk_tile(asteroid, z, x, y):
+    if asteroid not in ASTEROIDS:
+        return jsonify({"error": "Invalid asteroid"}), 404
+    asteroid_dir = os.path.join(RISK_TILE_DIR, tile_slug(asteroid))
+    if not os.path.isdir(asteroid_dir):
+        # not built yet: draw nothing, and look again once the tiles may exist
+        response = app.response_class(EMPTY_TILE_PNG, mimetype='image/png')
+        response.headers['Cache-Control'] = 'public, max-age=3600'
+        return response
+    path = os.path.join(str(z), str(x), '%d.png' % y)
+    if os.path.exists(os.path.join(asteroid_dir, path)):
+        response = send_from_directory(asteroid_dir, path, mimetype='image/png', conditional=True)
+    else:
+        response = app.response_class(EMPTY_TILE_PNG, mimetype='image/png')
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    return response
+
+TILE_LAYERS = {
+    "imagery": {
+        "url": "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}",
+        "mimetype": "image/jpeg"
+    },
+    "labels": {
+        "url": "https://{s}.basemaps.cartocdn.com/dark_only_labels/{z}/{x}/{y}.png",
+        "subdomains": "abcd",
+        "mimetype": "image/png"
+    }
+}
+TILE_CACHE_DIR = os.environ.get('TILE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tiles', 'base'))
+TILE_CACHE_MAX_BYTES = int(os.environ.get('TILE_CACHE_MAX_BYTES', 1 << 30))
+MAX_TILE_ZOOM = 19
+
+class UpstreamTileError(Exception):
+    pass
+
+# Every process serving the same directory shares one sqlite index of sizes and
+# last-use times, so max_bytes bounds the directory, not each worker's share
+class TileCache:
+    def __init__(self, root, max_bytes, layers=TILE_LAYERS):
+        self.root = root
+        self.index_path = os.path.join(root, '.index.sqlite')
+        self.max_bytes = max_bytes
+        self.layers = layers
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.inflight = SingleFlight()
+        if os.path.isdir(self.root):
+            self.scan()
+
+    # one short connection per call, so forked and green workers never share one
+    @contextlib.contextmanager
+    def index(self):
+        os.makedirs(self.root, exist_ok=True)
+        connection = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.execute('CREATE TABLE IF NOT EXISTS tiles (path TEXT PRIMARY KEY, size INTEGER NOT NULL, used REAL NOT NULL)')
+                connection.execute('CREATE INDEX IF NOT EXISTS tiles_used ON tiles (used)')
+                yield connection
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+        finally:
+            connection.close()
+
+    # tiles cached before the index existed are indexed by mtime
+    def scan(self):
+        with self.index() as index:
+            if index.execute('SELECT 1 FROM tiles LIMIT 1').fetchone() is not None:
+                return
+            for directory, _, files in os.walk(self.root):
+                for filename in files:
+                    if filename.startswith('.') or filename.endswith('.tmp'):
+                        continue
+                    path = os.path.join(directory, filename)
+                    stat = os.stat(path)
+                    index.execute('INSERT INTO tiles VALUES (?, ?, ?)',
+                                  (os.path.relpath(path, self.root), stat.st_size, stat.st_mtime))
+
+    def path(self, layer, z, x, y):
+        digest = hashlib.sha1(('%s/%d/%d/%d' % (layer, z, x, y)).encode('ascii')).hexdigest()
+        return os.path.join(self.root, layer, digest[:2], digest[2:4], '%d_%d_%d' % (z, x, y))
+
+    def upstream_url(self, layer, z, x, y):
+        config = self.layers[layer]
+        subdomains = config.get('subdomains')
+        server = subdomains[(x + y) % len(subdomains)] if subdomains else ''
+        return config['url'].format(s=server, z=z, x=x, y=y)
+
+    def read(self, path):
+        try:
+            with open(path, 'rb') as f:
+                body = f.read()
+        except FileNotFoundError:
+            return None
+        with self.index() as index:
+            index.execute('UPDATE tiles SET used = ? WHERE path = ?', (time.time(), os.path.relpath(path, self.root)))
+        return body
+
+    def store(self, path, body):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = '%s.%d.%d.tmp' % (path, os.getpid(), threading.get_ident())
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        name = os.path.relpath(path, self.root)
+        with self.index() as index:
+            os.replace(tmp_path, path)
+            index.execute('INSERT OR REPLACE INTO tiles VALUES (?, ?, ?)', (name, len(body), time.time()))
+            total = index.execute('SELECT SUM(size) FROM tiles').fetchone()[0]
+            evicted = []
+            oldest = index.execute('SELECT path, size FROM tiles WHERE path != ? ORDER BY used', (name,))
+            for old_name, size in oldest:
+                if total <= self.max_bytes:
+                    break
+                evicted.append(old_name)
+                total -= size
+            oldest.close()
+            for old_name in evicted:
+                index.execute('DELETE FROM tiles WHERE path = ?', (old_name,))
+                try:
+                    os.remove(os.path.join(self.root, old_name))
+                except FileNotFoundError:
+                    pass
+
+    def download(self, layer, z, x, y, path):
+        body = self.read(path)
+        if body is not None:
+            return body
+        upstream = urllib.request.Request(self.upstream_url(layer, z, x, y), headers={"User-Agent": "Egypteroids tile cache"})
+        try:
+            with urllib.request.urlopen(upstream, timeout=10) as response:
+                body = response.read()
+        except (urllib.error.URLError, OSError) as error:
+            raise UpstreamTileError(str(error))
+        self.store(path, body)
+        return body
+
+    def fetch(self, layer, z, x, y):
+        path = self.path(layer, z, x, y)
+        body = self.read(path)
+        with self.lock:
+            if body is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if body is None:
+            # concurrent misses for the same tile share one upstream request
+            body = self.inflight.do(path, lambda: self.download(layer, z, x, y, path))
+        return body
+
+    # tiles and bytes cover the whole directory; hits and misses this process
+    def stats(self):
+        with self.index() as index:
+            tiles, total = index.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM tiles').fetchone()
+        with self.lock:
+            return {
+                "tiles": tiles,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+tile_cache = TileCache(TILE_CACHE_DIR, TILE_CACHE_MAX_BYTES)
+
+def tiles_in_bbox(min_lon, min_lat, max_lon, max_lat, zoom):
+    def tile_xy(lon, lat):
+        lat = max(min(lat, 85.0511), -85.0511)
+        n = 2 ** zoom
+        x = int((lon + 180) / 360 * n)
+        y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+        return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+    x0, y0 = tile_xy(min_lon, max_lat)
+    x1, y1 = tile_xy(max_lon, min_lat)
+    return [(zoom, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+def prefetch_tiles(bbox, min_zoom, max_zoom, layers, workers=8):
+    tiles = [tile for zoom in range(min_zoom, max_zoom + 1) for tile in tiles_in_bbox(*bbox, zoom)]
+    jobs = [(layer,) + tile for layer in layers for tile in tiles]
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in as_completed([executor.submit(tile_cache.fetch, *job) for job in jobs]):
+            try:
+                future.result()
+            except UpstreamTileError:
+                failed += 1
+    print("%d tiles prefetched, %d failed" % (len(jobs) - failed, failed))
+
+@app.route('/tiles/base/<layer>/<int:z>/<int:x>/<int:y>')
+def base_tile(layer, z, x, y):
+    if layer not in TILE_LAYERS:
+        return jsonify({"error": "Invalid layer"}), 404
+    if not (0 <= z <= MAX_TILE_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return jsonify({"error": "Invalid tile"}), 404
+    try:
+        body = tile_cache.fetch(layer, z, x, y)
+    except UpstreamTileError as error:
+        return jsonify({"error": "Upstream tile server failed: %s" % error}), 502
+    response = app.response_class(body, mimetype=TILE_LAYERS[layer]['mimetype'])
+    response.headers['Cache-Control'] = 'public, max-age=604800'
+    return response
+
+@app.route('/api/tiles/stats')
+def tile_stats():
+    return jsonify(tile_cache.stats())
+
+DATA_RELOAD_INTERVAL = float(os.environ.get('DATA_RELOAD_INTERVAL', 0))
+DATA_RELOAD_TOKEN = os.environ.get('DATA_RELOAD_TOKEN')
+DATA_RELOAD_TRIGGER = os.path.join(SHARED_TABLE_DIR, 'reload')
+DATA_RELOAD_POLL_S = 1.0
+data_reload_lock = threading.Lock()
+# only the development server trusts loopback clients without a token
+data_reload_loopback = True
+shared_table_root = None
+data_watcher_pid = None
+
+def scenario_records(key):
+    if key[0] in ('multi_city', 'monte_carlo'):
+        key = key[1:]
+    return key[0], key[1]
+
+def swap_data(asteroids, locations):
+    global ASTEROIDS, LOCATIONS, BOOTSTRAP, DATA_VERSION
+    old_asteroids, old_locations, old_version = ASTEROIDS, LOCATIONS, DATA_VERSION
+    version = data_version(asteroids, locations)
+    if version == old_version:
+        return {"version": version, "changed": False}
+    if shared_table_root is not None:
+        asteroids.share(shared_table_root)
+        locations.share(shared_table_root)
+    bootstrap = build_bootstrap(asteroids, locations, version)
+    
+    # Each rebinding is atomic. The catalogs go first, so nothing computed from
+    # the old data can be cached under the new version.
+    ASTEROIDS, LOCATIONS, BOOTSTRAP = asteroids, locations, bootstrap
+    compute_pool.reset()
+    DATA_VERSION = version
+    remove_superseded_tables(old_asteroids, asteroids, NEOCatalog.SHARED_ARRAYS)
+    remove_superseded_tables(old_locations, locations, CityCatalog.SHARED_ARRAYS)
     
-    return jsonify(result)
+    cities_changed = old_locations.fingerprint() != locations.fingerprint()
+    
+    def unchanged(key):
+        if key[0] == 'multi_city' and cities_changed:
+            return False
+        asteroid_name, location_name = scenario_records(key)
+        return (asteroid_name in old_asteroids and asteroid_name in asteroids
+                and old_asteroids[asteroid_name] == asteroids[asteroid_name]
+                and location_name in old_locations and location_name in locations
+                and old_locations[location_name] == locations[location_name])
+    
+    return dict(version=version, changed=True, **scenario_cache.retag(old_version, version, unchanged))
+
+def reload_data():
+    with data_reload_lock:
+        return swap_data(load_asteroid_catalog(), load_city_catalog())
+
+def reload_data_safely():
+    try:
+        app.logger.info("data reload: %s", reload_data())
+    except Exception:
+        app.logger.exception("data reload failed, keeping version %s", DATA_VERSION)
+
+def data_source_mtimes():
+    paths = os.environ.get('NEO_CATALOG_PATH', '').split(os.pathsep) + os.environ.get('CITY_CATALOG_PATH', '').split(os.pathsep)
+    return {path: os.stat(path).st_mtime_ns if os.path.exists(path) else None for path in filter(None, paths)}
+
+def reload_trigger_stamp():
+    try:
+        with open(DATA_RELOAD_TRIGGER) as f:
+            return f.read()
+    except OSError:
+        return None
+
+def data_sources_state():
+    return data_source_mtimes() if DATA_RELOAD_INTERVAL > 0 else None, reload_trigger_stamp()
+
+# Taken when the catalogs are loaded; forked workers inherit it, so one that
+# starts after a reload still sees that its data is stale
+data_sources_seen = data_sources_state()
+
+def watch_data_sources(interval):
+    global data_sources_seen
+    while True:
+        time.sleep(interval)
+        current = data_sources_state()
+        if current != data_sources_seen:
+            data_sources_seen = current
+            reload_data_safely()
+
+# Threads don't survive fork, so each server process starts its own watcher.
+# Besides the catalog files (with DATA_RELOAD_INTERVAL) it watches the shared
+# trigger file that /api/data/reload touches, so a reload reaches every worker.
+def start_data_watcher(interval=DATA_RELOAD_INTERVAL or DATA_RELOAD_POLL_S):
+    global data_watcher_pid
+    if data_watcher_pid == os.getpid():
+        return
+    data_watcher_pid = os.getpid()
+    threading.Thread(target=watch_data_sources, args=(interval,), daemon=True).start()
+
+def trigger_data_reload():
+    os.makedirs(os.path.dirname(DATA_RELOAD_TRIGGER), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(DATA_RELOAD_TRIGGER))
+    with os.fdopen(fd, 'w') as f:
+        f.write(secrets.token_hex(8))
+    os.replace(tmp_path, DATA_RELOAD_TRIGGER)
+
+@app.before_request
+def ensure_data_watcher():
+    # covers servers that fork without calling start_data_watcher themselves
+    if data_watcher_pid != os.getpid():
+        start_data_watcher()
+
+@app.after_request
+def add_data_version(response):
+    response.headers['X-Data-Version'] = DATA_VERSION
+    return response
+
+@app.route('/api/data/version')
+def get_data_version():
+    return jsonify({"version": DATA_VERSION, "asteroids": len(ASTEROIDS), "locations": len(LOCATIONS)})
+
+@app.route('/api/data/reload', methods=['POST'])
+def request_data_reload():
+    if DATA_RELOAD_TOKEN:
+        allowed = secrets.compare_digest(request.headers.get('X-Reload-Token', ''), DATA_RELOAD_TOKEN)
+    elif data_reload_loopback:
+        allowed = request.remote_addr in ('127.0.0.1', '::1')
+    else:
+        return jsonify({"error": "Set DATA_RELOAD_TOKEN to enable reloads"}), 403
+    if not allowed:
+        return jsonify({"error": "Forbidden"}), 403
+    trigger_data_reload()
+    return jsonify({"version": DATA_VERSION, "reloading": True}), 202
+
+WARM_VELOCITIES = range(10, 71, 10)
+WARM_OPTIONS = {"fields": ["blast", "contours"], "zoom": DEFAULT_CONTOUR_ZOOM}
+
+def warm_scenario_cache():
+    keys = [
+        scenario_key(asteroid_name, location_name, velocity, WARM_OPTIONS)
+        for asteroid_name in ASTEROIDS.featured
+        for location_name in LOCATIONS.featured
+        for velocity in WARM_VELOCITIES
+    ]
+    with ThreadPoolExecutor(max(compute_pool.workers, 1)) as executor:
+        list(executor.map(scenario_body, keys))
+
+# Everything the workers read is built at import time; create_app() finishes
+# the job (optionally warming the scenario cache for the featured selections)
+# and freezes the heap so forked workers keep sharing those pages.
+def share_tables(root=SHARED_TABLE_DIR):
+    global shared_table_root
+    shared_table_root = root
+    ASTEROIDS.share(root)
+    LOCATIONS.share(root)
+
+def create_app(warm=False):
+    global data_reload_loopback
+    # behind a proxy every client looks like loopback
+    data_reload_loopback = False
+    share_tables()
+    if warm:
+        warm_scenario_cache()
+        # workers fork their own compute pools
+        compute_pool.reset()
+    gc.collect()
+    gc.freeze()
+    return app
+
+if gunicorn is not None:
+    class ProductionServer(gunicorn.app.base.BaseApplication):
+        def __init__(self, application, options):
+            self.application = application
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+# Locks created at import are native ones even in a gevent worker, which
+# patches threading only after fork; a greenlet blocking on one held by another
+# greenlet would stall the whole worker. This swaps in fresh (green) locks.
+def renew_locks():
+    global stream_counts_lock, data_reload_lock
+    holders = [scenario_cache, entry_cache, ASTEROIDS, LOCATIONS, scenario_flights, compute_pool,
+               tile_cache, tile_cache.inflight] + [node.memo for node in scenario_graph.nodes.values()]
+    for holder in holders:
+        holder.lock = threading.Lock()
+    stream_counts_lock = threading.Lock()
+    data_reload_lock = threading.Lock()
+
+# the pool's manager thread subclasses the Thread class seen at import, before
+# the patch; joined on exit it never wakes and the worker hangs until gunicorn
+# kills it, so the module is reloaded against the patched threading
+def renew_process_pool():
+    global ProcessPoolExecutor, BrokenProcessPool
+    importlib.reload(concurrent.futures.process)
+    ProcessPoolExecutor = concurrent.futures.process.ProcessPoolExecutor
+    BrokenProcessPool = concurrent.futures.process.BrokenProcessPool
+
+def init_server_worker(worker):
+    renew_locks()
+    renew_process_pool()
+    compute_pool.start()
+    start_data_watcher()
+
+# gevent workers hold each connection, live streams included, in a greenlet.
+# The worker patches threading only after fork, so the locks and green threads
+# (the data watcher among them) are set up in post_worker_init.
+def serve(bind, workers, connections, warm):
+    if gunicorn is None or gevent is None:
+        raise SystemExit("serve requires gunicorn and gevent: pip install gunicorn gevent flask-sock")
+    # every web worker forks its own pool, so split the cores between them
+    if 'COMPUTE_WORKERS' not in os.environ:
+        compute_pool.workers = max(1, (os.cpu_count() or 1) // workers)
+    if 'COMPUTE_QUEUE_DEPTH' not in os.environ:
+        compute_pool.max_pending = 4 * compute_pool.workers
+    ProductionServer(create_app(warm=warm), {
+        "bind": bind,
+        "workers": workers,
+        "worker_class": "gevent",
+        "worker_connections": connections,
+        "preload_app": True,
+        "post_worker_init": init_server_worker,
+        "accesslog": "-"
+    }).run()
+
+BENCHMARK_PATHS = {
+    "simulate": ("POST", "/api/simulate"),
+    "bootstrap": ("GET", "/api/bootstrap"),
+    "search": ("GET", "/api/locations/search?q=to&limit=10")
+}
+
+def benchmark_worker(url, target, seconds, worker):
+    parts = urllib.parse.urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80)
+    method, path = BENCHMARK_PATHS[target]
+    asteroids = list(ASTEROIDS.featured)
+    locations = list(LOCATIONS.featured)
+    velocities = list(WARM_VELOCITIES)
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    i = worker
+    while time.perf_counter() < deadline:
+        body = None
+        headers = {}
+        if method == 'POST':
+            body = json.dumps(dict(
+                WARM_OPTIONS,
+                asteroid=asteroids[i % len(asteroids)],
+                location=locations[i // len(asteroids) % len(locations)],
+                velocity=velocities[i % len(velocities)]
+            ))
+            headers["Content-Type"] = "application/json"
+        i += 1
+        start = time.perf_counter()
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+    return latencies, errors
+
+def run_benchmark(url, target, seconds, concurrency):
+    with multiprocessing.Pool(concurrency) as pool:
+        results = pool.starmap(benchmark_worker, [(url, target, seconds, worker) for worker in range(concurrency)])
+    latencies = np.sort(np.concatenate([np.array(r[0]) for r in results]))
+    errors = sum(r[1] for r in results)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / seconds, 1),
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies, 50)) * 1000, 2),
+            "p95": round(float(np.percentile(latencies, 95)) * 1000, 2),
+            "p99": round(float(np.percentile(latencies, 99)) * 1000, 2)
+        }
+    }
 
 if __name__ == '__main__':
-    print("\nServer starting...")
-    print("Open your browser: http://127.0.0.1:5000")
-    app.run(debug=True, host='127.0.0.1', port=5000)
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest='command')
+    build_population = commands.add_parser('build-population', help='convert an ESRI ASCII population grid into a summed-area table')
+    build_population.add_argument('ascii_grid')
+    build_population.add_argument('prefix')
+    build_risk = commands.add_parser('build-risk-tiles', help='precompute expected-casualty map tiles per asteroid')
+    build_risk.add_argument('asteroids', nargs='*', help='asteroid names (default: all)')
+    build_risk.add_argument('--velocity', type=float, default=RISK_VELOCITY)
+    build_risk.add_argument('--max-zoom', type=int, default=RISK_MAX_ZOOM)
+    build_risk.add_argument('--grid', type=float, default=RISK_GRID_DEG, help='grid cell size in degrees')
+    build_risk.add_argument('--workers', type=int, default=None)
+    build_risk.add_argument('--out', default=RISK_TILE_DIR)
+    prefetch = commands.add_parser('prefetch-tiles', help='download base map tiles for a bounding box into the tile cache')
+    prefetch.add_argument('--bbox', type=float, nargs=4, metavar=('MIN_LON', 'MIN_LAT', 'MAX_LON', 'MAX_LAT'), default=[-180, -85, 180, 85])
+    prefetch.add_argument('--zoom', type=int, nargs=2, metavar=('MIN', 'MAX'), default=[0, 4])
+    prefetch.add_argument('--layers', nargs='+', choices=list(TILE_LAYERS), default=list(TILE_LAYERS))
+    prefetch.add_argument('--workers', type=int, default=8)
+    serve_parser = commands.add_parser('serve', help='run the production server (gunicorn, preloaded before fork)')
+    serve_parser.add_argument('--bind', default=os.environ.get('BIND', '127.0.0.1:8000'))
+    serve_parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1)))
+    serve_parser.add_argument('--connections', type=int, default=int(os.environ.get('WEB_CONNECTIONS', 1000)),
+                              help='simultaneous connections per worker, open streams included')
+    serve_parser.add_argument('--no-warm', dest='warm', action='store_false', help='skip precomputing featured scenarios before fork')
+    bench = commands.add_parser('benchmark', help='measure requests/sec against a running server')
+    bench.add_argument('--url', default='http://127.0.0.1:8000')
+    bench.add_argument('--target', choices=list(BENCHMARK_PATHS), default='simulate')
+    bench.add_argument('--seconds', type=float, default=10)
+    bench.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    if args.command == 'build-population':
+        build_population_raster(args.ascii_grid, args.prefix)
+    elif args.command == 'build-risk-tiles':
+        build_risk_tiles(args.asteroids or list(ASTEROIDS.featured), args.velocity, args.max_zoom, args.grid, args.workers, args.out)
+    elif args.command == 'prefetch-tiles':
+        prefetch_tiles(args.bbox, args.zoom[0], args.zoom[1], args.layers, args.workers)
+    elif args.command == 'serve':
+        serve(args.bind, args.workers, args.connections, args.warm)
+    elif args.command == 'benchmark':
+        print(json.dumps(run_benchmark(args.url, args.target, args.seconds, args.concurrency), indent=2))
+    else:
+        print("\nServer starting...")
+        print("Open your browser: http://127.0.0.1:5000")
+        start_data_watcher()
+        app.run(debug=True, host='127.0.0.1', port=5000)
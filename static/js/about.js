@@ -0,0 +1,3 @@
+home = () => {
+    window.location.href = "/"
+}
@@ -0,0 +1,236 @@
+home = () => {
+    window.location.href = "/"
+}
+const canvas = document.getElementById('gameCanvas');
+const ctx = canvas.getContext('2d');
+const container = document.getElementById('gameContainer');
+
+const playerImage = new Image();
+playerImage.src = 'https://i.postimg.cc/4ytRb9Kf/5958dcd313d478f-removebg-preview.png';
+
+let gameActive = true;
+let score = 0;
+let health = 100;
+let mouseX = canvas.width / 2;
+let mouseY = canvas.height / 2;
+let mouseDown = false;
+
+const player = {
+    x: canvas.width / 2 - 20,
+    y: canvas.height - 80,
+    w: 60,
+    h: 75,
+    speed: 0.15,
+};
+
+let bullets = [];
+let meteors = [];
+let lastShot = 0;
+let meteorSpawnRate = 1000;
+let lastMeteorSpawn = 0;
+
+canvas.addEventListener('mousemove', (e) => {
+    const rect = canvas.getBoundingClientRect();
+    mouseX = e.clientX - rect.left;
+    mouseY = e.clientY - rect.top;
+});
+
+canvas.addEventListener('mousedown', (e) => {
+    if (gameActive) {
+        mouseDown = true;
+    }
+    shoot = document.getElementById('shoot');
+    shoot.play()
+});
+
+canvas.addEventListener('mouseup', (e) => {
+    mouseDown = false;
+});
+
+canvas.addEventListener('mouseleave', (e) => {
+    mouseDown = false;
+});
+
+function shootBullet() {
+    const now = Date.now();
+    if (now - lastShot > 200) {
+        bullets.push({
+            x: player.x + player.w / 2 - 2,
+            y: player.y,
+            w: 4,
+            h: 15,
+            speed: 8
+        });
+        lastShot = now;
+    }
+}
+
+function spawnMeteor() {
+    const size = Math.random() * 30 + 20;
+    meteors.push({
+        x: Math.random() * (canvas.width - size),
+        y: -size,
+        w: size,
+        h: size,
+        speed: Math.random() * 2 + 1,
+        rotation: Math.random() * Math.PI * 2,
+        rotSpeed: (Math.random() - 0.5) * 0.1
+    });
+}
+
+function drawPlayer() {
+    if (playerImage.complete) {
+        ctx.drawImage(playerImage, player.x, player.y, player.w, player.h);
+    } else {
+        ctx.fillStyle = player.color;
+        ctx.beginPath();
+        ctx.moveTo(player.x + player.w / 2, player.y);
+        ctx.lineTo(player.x, player.y + player.h);
+        ctx.lineTo(player.x + player.w / 2, player.y + player.h - 10);
+        ctx.lineTo(player.x + player.w, player.y + player.h);
+        ctx.closePath();
+        ctx.fill();
+    }
+}
+
+function drawBullet(b) {
+    ctx.fillStyle = '#ff0';
+    ctx.fillRect(b.x, b.y, b.w, b.h);
+}
+
+function drawMeteor(m) {
+    ctx.save();
+    ctx.translate(m.x + m.w / 2, m.y + m.h / 2);
+    ctx.rotate(m.rotation);
+
+    ctx.fillStyle = '#7a7a7a';
+    ctx.beginPath();
+    ctx.arc(0, 0, m.w / 2, 0, Math.PI * 2);
+    ctx.fill();
+
+    ctx.fillStyle = '#5a5a5a';
+    for (let i = 0; i < 3; i++) {
+        const angle = (i / 3) * Math.PI * 2;
+        const dist = m.w / 4;
+        ctx.beginPath();
+        ctx.arc(Math.cos(angle) * dist, Math.sin(angle) * dist, m.w / 8, 0, Math.PI * 2);
+        ctx.fill();
+    }
+
+    ctx.restore();
+}
+
+function update() {
+    if (!gameActive) return;
+
+    const dx = mouseX - (player.x + player.w / 2);
+    const dy = mouseY - (player.y + player.h / 2);
+    player.x += dx * player.speed;
+    player.y += dy * player.speed;
+
+    player.x = Math.max(0, Math.min(canvas.width - player.w, player.x));
+    player.y = Math.max(Math.min(canvas.height - player.h, player.y), Math.min(canvas.height / 2 - player.h));
+
+    if (mouseDown) {
+        shootBullet();
+    }
+
+    bullets = bullets.filter(b => {
+        b.y -= b.speed;
+        return b.y > -b.h;
+    });
+
+    const now = Date.now();
+    if (now - lastMeteorSpawn > meteorSpawnRate) {
+        spawnMeteor();
+        lastMeteorSpawn = now;
+        meteorSpawnRate = Math.max(500, meteorSpawnRate - 5);
+    }
+
+    meteors = meteors.filter(m => {
+        m.y += m.speed;
+        m.rotation += m.rotSpeed;
+
+        const playerCenterX = player.x + player.w / 2;
+        const playerCenterY = player.y + player.h / 2;
+        const meteorCenterX = m.x + m.w / 2;
+        const meteorCenterY = m.y + m.h / 2;
+        const distToPlayer = Math.sqrt(
+            Math.pow(playerCenterX - meteorCenterX, 2) +
+            Math.pow(playerCenterY - meteorCenterY, 2)
+        );
+
+        if (distToPlayer < m.w / 2 + player.w / 2) {
+            health -= 20;
+            document.getElementById('health').textContent = health;
+            const explosion = document.getElementById('explosion');
+            explosion.play();
+            if (health <= 0) {
+                gameOver();
+            }
+            return false;
+        }
+
+        if (m.y > canvas.height + m.h) {
+            health -= 10;
+            document.getElementById('health').textContent = health;
+            if (health <= 0) {
+                gameOver();
+            }
+            return false;
+        }
+
+        for (let i = bullets.length - 1; i >= 0; i--) {
+            const b = bullets[i];
+            const dx = (m.x + m.w / 2) - (b.x + b.w / 2);
+            const dy = (m.y + m.h / 2) - (b.y + b.h / 2);
+            const dist = Math.sqrt(dx * dx + dy * dy);
+
+            if (dist < m.w / 2 + b.h / 2) {
+                bullets.splice(i, 1);
+                score += 10;
+                document.getElementById('score').textContent = score;
+                return false;
+            }
+        }
+
+        return true;
+    });
+}
+
+function draw() {
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+    drawPlayer();
+    bullets.forEach(drawBullet);
+    meteors.forEach(drawMeteor);
+}
+
+function gameLoop() {
+    update();
+    draw();
+    requestAnimationFrame(gameLoop);
+}
+
+function gameOver() {
+    gameActive = false;
+    document.getElementById('finalScore').textContent = score;
+    document.getElementById('gameOver').style.display = 'block';
+    const dead = document.getElementById('dead');
+    dead.play()
+}
+
+function restartGame() {
+    gameActive = true;
+    score = 0;
+    health = 100;
+    bullets = [];
+    meteors = [];
+    meteorSpawnRate = 1000;
+    player.x = canvas.width / 2 - 20;
+    player.y = canvas.height - 80;
+    document.getElementById('score').textContent = score;
+    document.getElementById('health').textContent = health;
+    document.getElementById('gameOver').style.display = 'none';
+}
+
+gameLoop();
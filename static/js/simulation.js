@@ -0,0 +1,581 @@
+const API_URL = window.location.origin;
+
+let map;
+let markers = {};
+let circles = {};
+let riskLayer;
+
+function initMap() {
+    map = L.map('map').setView([20, 0], 2);
+
+    L.tileLayer(API_URL + '/tiles/base/imagery/{z}/{x}/{y}', {
+        attribution: 'Esri',
+        maxZoom: 18
+    }).addTo(map);
+
+    L.tileLayer(API_URL + '/tiles/base/labels/{z}/{x}/{y}', {
+        maxZoom: 18,
+        opacity: 0.7
+    }).addTo(map);
+}
+
+let bootstrapPromise;
+
+// Asteroid metadata and locations are fetched once per session and revalidated by ETag
+function getBootstrap() {
+    if (!bootstrapPromise) {
+        const cached = sessionStorage.getItem('bootstrap');
+        if (cached) {
+            bootstrapPromise = Promise.resolve(JSON.parse(cached));
+        } else {
+            bootstrapPromise = fetch(API_URL + '/api/bootstrap')
+            .then(function(response) {
+                if (!response.ok) throw new Error('Bootstrap API failed');
+                return response.json();
+            })
+            .then(function(data) {
+                try {
+                    sessionStorage.setItem('bootstrap', JSON.stringify(data));
+                } catch (error) {
+                    console.warn('Could not store bootstrap data:', error);
+                }
+                return data;
+            })
+            .catch(function(error) {
+                bootstrapPromise = null;
+                throw error;
+            });
+        }
+    }
+    return bootstrapPromise;
+}
+
+// A data refresh on the server changes X-Data-Version; drop what was cached from the old data
+function checkDataVersion(response) {
+    const version = response.headers.get('X-Data-Version');
+    if (!version || !bootstrapPromise) return;
+
+    bootstrapPromise.then(function(data) {
+        if (data.version !== version) {
+            sessionStorage.removeItem('bootstrap');
+            bootstrapPromise = null;
+            asteroidDetails = {};
+            simulationResults.clear();
+        }
+    }).catch(function() {});
+}
+
+async function loadData() {
+    try {
+        const data = await getBootstrap();
+        addLocationMarkers(data.locations);
+    } catch (error) {
+        console.error('Error loading map markers:', error);
+    }
+}
+
+function addLocationMarkers(locations) {
+    const cityIcon = L.divIcon({
+        className: 'custom-marker',
+        html: '💥',
+        iconSize: [30, 30],
+        iconAnchor: [15, 30]
+    });
+
+    for (const cityName in locations) {
+        if (locations.hasOwnProperty(cityName)) {
+            const cityData = locations[cityName];
+            const marker = L.marker([cityData.lat, cityData.lon], { icon: cityIcon })
+                .addTo(map)
+                .bindPopup('<b>' + cityName + '</b>');
+            markers[cityName] = marker;
+        }
+    };
+    }
+
+document.getElementById('velocity-slider').addEventListener('input', function(e) {
+    document.getElementById('velocity-value').textContent = e.target.value;
+    schedulePrefetch();
+});
+
+// Simulation results, keyed by inputs so a prefetched result is reused on click
+const MAX_CACHED_RESULTS = 50;
+const PREFETCH_DELAY_MS = 300;
+let simulationResults = new Map();
+let prefetchTimer;
+
+function currentSelection() {
+    return {
+        asteroid: document.getElementById('asteroid-select').value,
+        location: document.getElementById('location-select').value,
+        velocity: parseInt(document.getElementById('velocity-slider').value)
+    };
+}
+
+function fetchSimulation(selection) {
+    const key = selection.asteroid + '|' + selection.location + '|' + selection.velocity;
+    if (!simulationResults.has(key)) {
+        if (simulationResults.size >= MAX_CACHED_RESULTS) {
+            simulationResults.delete(simulationResults.keys().next().value);
+        }
+        simulationResults.set(key, postSimulation({ asteroid: selection.asteroid, location: selection.location, velocity: selection.velocity, fields: ['blast', 'contours'], zoom: 9 }, 0)
+        .catch(function(error) {
+            simulationResults.delete(key);
+            throw error;
+        }));
+    }
+    return simulationResults.get(key);
+}
+
+const MAX_BUSY_RETRIES = 3;
+
+// The server answers 503 with Retry-After when its simulation queue is full
+function postSimulation(body, attempt) {
+    return fetch(API_URL + '/api/simulate', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify(body)
+    })
+    .then(function(response) {
+        if (response.status === 503 && attempt < MAX_BUSY_RETRIES) {
+            const delay = (parseInt(response.headers.get('Retry-After')) || 1) * 1000;
+            return new Promise(resolve => setTimeout(resolve, delay))
+            .then(function() { return postSimulation(body, attempt + 1); });
+        }
+        if (!response.ok) throw new Error('Simulation API failed');
+        checkDataVersion(response);
+        return response.json();
+    });
+}
+
+function isFastMode() {
+    return document.getElementById('fast-mode').checked;
+}
+
+function rememberResult(result) {
+    const key = result.asteroid + '|' + result.location + '|' + result.velocity_km_s;
+    simulationResults.delete(key);
+    if (simulationResults.size >= MAX_CACHED_RESULTS) {
+        simulationResults.delete(simulationResults.keys().next().value);
+    }
+    simulationResults.set(key, Promise.resolve(result));
+}
+
+// Slider positions go over one long-lived WebSocket; the server skips positions
+// overtaken while it computes and only answers the latest
+let resultStream = null;
+let streamUnavailable = false;
+let shownResult = null;
+
+function openResultStream() {
+    if (resultStream || streamUnavailable || !window.WebSocket) return;
+
+    const socket = new WebSocket(API_URL.replace(/^http/, 'ws') + '/api/stream');
+    const stream = resultStream = { socket: socket, open: false, seq: 0, answered: 0, pending: null, sent: null, busyTimer: null };
+    socket.onopen = function() {
+        stream.open = true;
+        if (stream.pending) sendStreamPosition(stream.pending);
+    };
+    socket.onmessage = function(e) {
+        const message = JSON.parse(e.data);
+        if (message.type === 'result') {
+            stream.answered = message.seq;
+            showLiveResult(message.result);
+        } else if (message.type === 'busy') {
+            // The server's compute queue was full; resend the position unless it has moved on since
+            clearTimeout(stream.busyTimer);
+            stream.busyTimer = setTimeout(function() {
+                if (resultStream === stream && stream.seq === message.seq) sendStreamPosition(stream.sent);
+            }, message.retry_after * 1000);
+        } else {
+            console.error('Error:', message.error);
+        }
+    };
+    socket.onclose = function() {
+        if (resultStream !== stream) return;
+        resultStream = null;
+        clearTimeout(stream.busyTimer);
+        // A server without streams refuses the socket outright; use plain requests from
+        // then on. A socket that dropped later reopens on the next update.
+        if (!stream.open) streamUnavailable = true;
+        const unanswered = stream.pending || (stream.answered < stream.seq ? stream.sent : null);
+        if (unanswered) fetchLiveResult(unanswered);
+    };
+}
+
+function fetchLiveResult(selection) {
+    return fetchSimulation(selection).then(function(result) {
+        if (result.velocity_km_s === currentSelection().velocity) showLiveResult(result);
+    })
+    .catch(error => console.error('Error:', error));
+}
+
+function showLiveResult(result) {
+    rememberResult(result);
+    if (shownResult && shownResult.asteroid === result.asteroid && shownResult.location === result.location) {
+        shownResult = result;
+        displayResults(result);
+        drawDamageZones(result, false);
+    }
+}
+
+function sendStreamPosition(selection) {
+    resultStream.pending = selection;
+    if (!resultStream.open) return;
+
+    resultStream.seq += 1;
+    resultStream.sent = selection;
+    resultStream.pending = null;
+    resultStream.socket.send(JSON.stringify({ seq: resultStream.seq, asteroid: selection.asteroid, location: selection.location, velocity: selection.velocity, fields: ['blast', 'contours'], zoom: 9 }));
+}
+
+function schedulePrefetch() {
+    clearTimeout(prefetchTimer);
+    const selection = currentSelection();
+    if (!selection.asteroid || !selection.location) return;
+
+    if (shownResult || isFastMode()) {
+        openResultStream();
+    }
+    if (resultStream) {
+        sendStreamPosition(selection);
+        return;
+    }
+    if (!isFastMode()) return;
+
+    prefetchTimer = setTimeout(function() {
+        fetchSimulation(selection).catch(error => console.error('Error:', error));
+    }, PREFETCH_DELAY_MS);
+}
+
+document.getElementById('fast-mode').addEventListener('change', schedulePrefetch);
+
+// Asteroid info
+document.getElementById('asteroid-select').addEventListener('change', function(e) {
+    const asteroidName = e.target.value;
+    const infoBox = document.getElementById('asteroid-info');
+    schedulePrefetch();
+
+    if (!asteroidName) {
+        infoBox.classList.remove('active');
+        return;
+    }
+
+    getAsteroidDetails(asteroidName)
+    .then(details => {
+        document.getElementById('asteroid-diameter').textContent = details.diameter_km + ' km';
+        document.getElementById('asteroid-type').textContent = details.spectral_type || 'Unknown';
+        infoBox.classList.add('active');
+    })
+    .catch(error => console.error('Error:', error));
+});
+
+let asteroidDetails = {};
+
+function getAsteroidDetails(asteroidName) {
+    if (!asteroidDetails[asteroidName]) {
+        asteroidDetails[asteroidName] = fetch(API_URL + '/api/asteroids/' + encodeURIComponent(asteroidName))
+        .then(function(response) {
+            if (!response.ok) throw new Error('Asteroid API failed');
+            return response.json();
+        })
+        .catch(function(error) {
+            delete asteroidDetails[asteroidName];
+            throw error;
+        });
+    }
+    return asteroidDetails[asteroidName];
+}
+
+// City search
+let citySearchResults = {};
+let citySearchTimer;
+
+document.getElementById('location-search').addEventListener('input', function(e) {
+    const query = e.target.value.trim();
+    const select = document.getElementById('location-select');
+
+    if (citySearchResults[query]) {
+        if (!Array.from(select.options).some(option => option.value === query)) {
+            const option = document.createElement('option');
+            option.value = query;
+            option.textContent = query;
+            select.appendChild(option);
+        }
+        select.value = query;
+        select.dispatchEvent(new Event('change'));
+        return;
+    }
+
+    clearTimeout(citySearchTimer);
+    if (query.length < 2) return;
+
+    citySearchTimer = setTimeout(function() {
+        fetch(API_URL + '/api/locations/search?limit=10&q=' + encodeURIComponent(query))
+        .then(response => response.json())
+        .then(data => {
+            const datalist = document.getElementById('location-suggestions');
+            datalist.innerHTML = '';
+            data.results.forEach(function(city) {
+                citySearchResults[city.name] = city;
+                const option = document.createElement('option');
+                option.value = city.name;
+                option.label = city.country;
+                datalist.appendChild(option);
+            });
+        })
+        .catch(error => console.error('Error:', error));
+    }, 150);
+});
+
+function showCityInfo(cityData) {
+    document.getElementById('city-country').textContent = cityData.country;
+    document.getElementById('city-population').textContent = (cityData.population / 1000000).toFixed(1) + ' million';
+    document.getElementById('city-area').textContent = cityData.area;
+    document.getElementById('city-info').classList.add('active');
+}
+
+// City info
+document.getElementById('location-select').addEventListener('change', function(e) {
+    const cityName = e.target.value;
+    const cityInfoBox = document.getElementById('city-info');
+    schedulePrefetch();
+
+    if (!cityName) {
+        cityInfoBox.classList.remove('active');
+        return;
+    }
+
+    if (citySearchResults[cityName]) {
+        showCityInfo(citySearchResults[cityName]);
+        return;
+    }
+
+    getBootstrap()
+    .then(data => {
+        const cityData = data.locations[cityName];
+        if (cityData) {
+            showCityInfo(cityData);
+        }
+    })
+    .catch(error => console.error('Error:', error));
+});
+
+document.getElementById('simulate-btn').addEventListener('click', function() {
+    const selection = currentSelection();
+
+    if (!selection.asteroid || !selection.location) {
+        alert('Please select both an asteroid and a location!');
+        return;
+    }
+
+    document.getElementById('map').classList.add('active');
+    document.getElementById('map-placeholder').classList.add('hidden');
+
+    if (!map) {
+        initMap();
+        loadData();
+    }
+
+    const btn = document.getElementById('simulate-btn');
+    btn.textContent = 'CALCULATING...';
+    btn.disabled = true;
+
+    clearTimeout(prefetchTimer);
+    const ready = fetchSimulation(selection);
+    document.getElementById('map').scrollIntoView({ behavior: 'smooth', block: 'center' });
+    const impact = isFastMode() ? ready : playImpactAnimation(ready);
+
+    impact
+    .then(function() { return ready; })
+    .then(result => {
+        shownResult = result;
+        displayResults(result);
+        drawDamageZones(result);
+        const explosion = document.getElementById('explosion');
+        explosion.play();
+
+        btn.textContent = 'SIMULATE IMPACT';
+        btn.disabled = false;
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('Error simulating impact');
+        btn.textContent = 'SIMULATE IMPACT';
+        btn.disabled = false;
+    });
+});
+
+const LANDING_MS = 250;
+
+// The meteor falls while the request is in flight and lands when the result is
+// ready: a fast response cuts the fall short, a slow one holds it at the end.
+// Either way the flash coincides with the results being drawn.
+function playImpactAnimation(ready) {
+    const animContainer = document.getElementById('impact-animation');
+    const meteor = document.getElementById('meteor');
+    const flash = document.getElementById('impact-flash');
+
+    const mapEl = document.getElementById('map');
+    const rect = mapEl.getBoundingClientRect();
+
+    const targetX = rect.left + rect.width / 2;
+    const targetY = rect.top + rect.height / 2;
+
+    meteor.style.left = targetX + 'px';
+    meteor.style.top = targetY + 'px';
+    flash.style.left = (targetX - 75) + 'px';
+    flash.style.top = (targetY - 75) + 'px';
+
+    function finish() {
+        animContainer.classList.remove('active');
+        meteor.classList.remove('falling');
+        flash.classList.remove('active');
+    }
+
+    animContainer.classList.add('active');
+    meteor.classList.add('falling');
+
+    ready.then(function() {
+        if (!meteor.getAnimations) return;
+        meteor.getAnimations().forEach(function(animation) {
+            const remaining = animation.effect.getComputedTiming().endTime - (animation.currentTime || 0);
+            if (remaining > LANDING_MS) animation.updatePlaybackRate(remaining / LANDING_MS);
+        });
+    }, function() {});
+
+    return new Promise(function(resolve) {
+        meteor.addEventListener('animationend', function() { resolve(ready); }, { once: true });
+    })
+    .then(function() {
+        flash.addEventListener('animationend', finish, { once: true });
+        flash.classList.add('active');
+    }, function(error) {
+        finish();
+        throw error;
+    });
+}
+
+function displayResults(result) {
+    const severeArea = Math.PI * Math.pow(result.damage_zones.severe.radius_km, 2);
+    const moderateArea = Math.PI * Math.pow(result.damage_zones.moderate.radius_km, 2);
+    const hiroshimaMultiplier = Math.round(result.energy_megatons / 0.015);
+    const craterDiameter = (result.asteroid_info.diameter_km * 20).toFixed(1);
+
+    const htmlContent = '<div class="result-item">' +
+        '<p><strong>Asteroid:</strong> ' + result.asteroid + ' (' + result.asteroid_info.diameter_km + ' km diameter)</p>' +
+        '<p><strong>Impact Location:</strong> ' + result.location + '</p>' +
+        '<p><strong>Impact Velocity:</strong> ' + result.velocity_km_s + ' km/s</p>' +
+        '<p><strong>Impact Energy:</strong> ' + result.energy_megatons.toLocaleString() + ' megatons of TNT (that is ' + hiroshimaMultiplier.toLocaleString() + 'x the Hiroshima Bomb!)</p>' +
+        '<p><strong>Crater Diameter:</strong> Approximately ' + craterDiameter + ' km</p>' +
+        '</div>' +
+        '<div class="damage-zone severe">' +
+        '<h4>SEVERE DAMAGE ZONE (20 PSI)</h4>' +
+        '<p><strong>Radius:</strong> ' + result.damage_zones.severe.radius_km + ' km</p>' +
+        '<p><strong>Area Affected:</strong> ' + severeArea.toFixed(1) + ' km²</p>' +
+        '<p><strong>Effects:</strong> ' + result.damage_zones.severe.description + '</p>' +
+        '<p><strong>Estimated Casualties:</strong> ' + result.damage_zones.severe.estimated_affected.toLocaleString() + ' people</p>' +
+        '</div>' +
+        '<div class="damage-zone moderate">' +
+        '<h4>MODERATE DAMAGE ZONE (3 PSI)</h4>' +
+        '<p><strong>Radius:</strong> ' + result.damage_zones.moderate.radius_km + ' km</p>' +
+        '<p><strong>Area Affected:</strong> ' + moderateArea.toFixed(1) + ' km²</p>' +
+        '<p><strong>Effects:</strong> ' + result.damage_zones.moderate.description + '</p>' +
+        '<p><strong>Estimated Casualties:</strong> ' + result.damage_zones.moderate.estimated_affected.toLocaleString() + ' people</p>' +
+        '</div>';
+
+    document.getElementById('results-content').innerHTML = htmlContent;
+    document.getElementById('results-panel').classList.add('active');
+}
+
+// Live slider updates pass fly=false to redraw the zones in place
+function drawDamageZones(result, fly) {
+    Object.values(circles).forEach(function(c) { map.removeLayer(c); });
+    circles = {};
+
+    const zoneStyles = {
+        moderate: { color: '#888', fillColor: '#666', fillOpacity: 0.2, weight: 2 },
+        severe: { color: '#fff', fillColor: '#444', fillOpacity: 0.3, weight: 2 }
+    };
+
+    result.damage_geojson.features.forEach(function(feature) {
+        const zone = feature.properties;
+        circles[zone.zone] = L.geoJSON(feature, { style: zoneStyles[zone.zone] })
+            .addTo(map)
+            .bindPopup(zone.psi + ' PSI Zone<br>' + zone.radius_km + ' km');
+    });
+
+    if (fly === false) return;
+
+    if (riskLayer) map.removeLayer(riskLayer);
+    riskLayer = L.tileLayer(API_URL + '/tiles/risk/' + encodeURIComponent(result.asteroid) + '/{z}/{x}/{y}.png', {
+        maxNativeZoom: 5,
+        maxZoom: 18,
+        opacity: 0.6
+    }).addTo(map);
+
+    const coords = [result.coordinates.lat, result.coordinates.lon];
+    map.flyTo(coords, 9, {duration: 1.5});
+}
+
+document.getElementById('research-btn').addEventListener('click', function() {
+    console.log(window.location.href.split("/")[2])
+    window.location.href = "/"
+});
+
+window.addEventListener('load', function() {
+    console.log('Page loaded!');
+    console.log('API_URL is:', API_URL);
+
+    var asteroidSelect = document.getElementById('asteroid-select');
+    var locationSelect = document.getElementById('location-select');
+
+    console.log('Asteroid select found:', asteroidSelect);
+    console.log('Location select found:', locationSelect);
+
+    if (!asteroidSelect || !locationSelect) {
+        alert('ERROR: Dropdown elements not found!');
+        return;
+    }
+
+    setTimeout(function() {
+        loadAsteroidsAndLocations();
+    }, 500);
+});
+
+function loadAsteroidsAndLocations() {
+    console.log('Starting to load data...');
+    console.log('API URL:', API_URL);
+
+    getBootstrap()
+    .then(function(data) {
+        console.log('Bootstrap data received, version:', data.version);
+        const asteroidSelect = document.getElementById('asteroid-select');
+        const locationSelect = document.getElementById('location-select');
+
+        if (!asteroidSelect || !locationSelect) {
+            console.error('Dropdown elements not found!');
+            return;
+        }
+
+        Object.keys(data.asteroids).forEach(function(asteroid) {
+            const option = document.createElement('option');
+            option.value = asteroid;
+            option.textContent = asteroid;
+            asteroidSelect.appendChild(option);
+        });
+        console.log('Added ' + Object.keys(data.asteroids).length + ' asteroids to dropdown');
+
+        Object.keys(data.locations).forEach(function(location) {
+            const option = document.createElement('option');
+            option.value = location;
+            option.textContent = location;
+            locationSelect.appendChild(option);
+        });
+        console.log('Added ' + Object.keys(data.locations).length + ' locations to dropdown');
+    })
+    .catch(function(error) {
+        console.error('Error loading asteroids and locations:', error);
+        alert('Error loading asteroids and locations: ' + error.message);
+    });
+}
@@ -0,0 +1,9 @@
+startredirect = () => {
+    window.location.href = "/simulation"
+}
+aboutredirect = () => {
+    window.location.href = "/about"
+}
+gameredirect = () => {
+    window.location.href = "/game"
+}
@@ -0,0 +1,12 @@
+from simulation import app, ASTEROIDS
+
+
+def test_details_are_revalidated_against_the_etag():
+    client = app.test_client()
+    name = next(iter(ASTEROIDS.featured))
+    response = client.get('/api/asteroids/' + name)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    revalidated = client.get('/api/asteroids/' + name, headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
@@ -0,0 +1,39 @@
+import pytest
+
+import simulation
+from simulation import app, ASTEROIDS, LOCATIONS, NEOCatalog
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+def test_rejects_batches_over_the_scenario_cap(client):
+    asteroids = list(ASTEROIDS.featured)
+    locations = list(LOCATIONS.featured)
+    velocities = [1 + i / 1000 for i in range(simulation.MAX_BATCH_SCENARIOS // (len(asteroids) * len(locations)) + 1)]
+    response = client.post('/api/simulate/batch', json={"asteroids": asteroids, "locations": locations, "velocities": velocities})
+    assert response.status_code == 400
+    assert "Too many scenarios" in response.get_json()["error"]
+
+
+def test_rejects_results_over_the_byte_limit(client, monkeypatch):
+    monkeypatch.setattr(simulation, 'MAX_BATCH_RESPONSE_BYTES', 1000)
+    response = client.post('/api/simulate/batch', json={"velocities": list(range(11, 71))})
+    assert response.status_code == 400
+    assert "too large" in response.get_json()["error"]
+
+
+def test_defaults_to_the_featured_asteroids(client, monkeypatch):
+    asteroids = NEOCatalog.from_mapping({name: ASTEROIDS[name] for name in ASTEROIDS.featured})
+    asteroids.ingest([{"name": "2000 AB1", "diameter_km": 0.2, "density": 2000, "spectral_type": "S"}])
+    monkeypatch.setattr(simulation, 'ASTEROIDS', asteroids)
+    monkeypatch.setattr(simulation.compute_pool, 'workers', 0)
+
+    response = client.post('/api/simulate/batch', json={})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert "2000 AB1" in asteroids
+    assert body["asteroids"] == list(asteroids.featured)
+    assert body["locations"] == list(LOCATIONS.featured)
@@ -0,0 +1,33 @@
+import pytest
+
+from simulation import app, ASTEROIDS, LOCATIONS
+
+BASE = {"mode": "monte_carlo", "velocity": 20, "samples": 50}
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+def scenario(**overrides):
+    return dict(BASE, asteroid=next(iter(ASTEROIDS.featured)), location=next(iter(LOCATIONS.featured)), **overrides)
+
+
+@pytest.mark.parametrize("overrides", [
+    {"velocity": -40},
+    {"velocity": 0},
+    {"samples": 1.9},
+    {"samples": True},
+    {"seed": 0.5},
+])
+def test_rejects_invalid_parameters(client, overrides):
+    response = client.post('/api/simulate', json=scenario(**overrides))
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_accepts_whole_number_samples(client):
+    response = client.post('/api/simulate', json=scenario(samples=50.0))
+    assert response.status_code == 200
+    assert response.get_json()["samples"] == 50
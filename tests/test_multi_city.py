@@ -0,0 +1,41 @@
+import pytest
+
+import simulation
+from simulation import CityCatalog, aggregate_city_impacts
+
+TOKYO = {"lat": 35.6762, "lon": 139.6503, "population": 37400000, "country": "Japan"}
+GAZETTEER = [
+    {"name": "Tokyo", "lat": 35.6895, "lon": 139.6917, "population": 8336599, "country": "JP"},
+    {"name": "Yokohama", "lat": 35.4437, "lon": 139.6380, "population": 3574443, "country": "JP"},
+    {"name": "Kawasaki", "lat": 35.5206, "lon": 139.7172, "population": 1437266, "country": "JP"},
+]
+ZONES = {"severe": {"radius_km": 500.0}, "moderate": {"radius_km": 1000.0}}
+
+
+def catalog(gazetteer):
+    cities = CityCatalog.from_mapping({"Tokyo": TOKYO})
+    cities.ingest(gazetteer)
+    return cities
+
+
+def test_metro_total_counted_alone_without_gazetteer(monkeypatch):
+    monkeypatch.setattr(simulation, 'LOCATIONS', catalog([]))
+    impacts = aggregate_city_impacts(TOKYO, ZONES)
+    assert impacts["totals"]["severe"] == TOKYO["population"]
+    assert [city["name"] for city in impacts["cities"]] == ["Tokyo"]
+
+
+def test_overlapping_metro_and_gazetteer_rows_counted_once(monkeypatch):
+    cities = catalog(GAZETTEER)
+    assert "Tokyo, JP" in cities
+    monkeypatch.setattr(simulation, 'LOCATIONS', cities)
+    impacts = aggregate_city_impacts(TOKYO, ZONES)
+    assert impacts["totals"]["severe"] == sum(city["population"] for city in GAZETTEER)
+    assert sorted(city["name"] for city in impacts["cities"]) == ["Kawasaki", "Tokyo, JP", "Yokohama"]
+
+
+def test_metro_far_from_gazetteer_cities_still_counted(monkeypatch):
+    cities = catalog([{"name": "Osaka", "lat": 34.6937, "lon": 135.5023, "population": 2691000, "country": "JP"}])
+    monkeypatch.setattr(simulation, 'LOCATIONS', cities)
+    impacts = aggregate_city_impacts(TOKYO, ZONES)
+    assert impacts["totals"]["severe"] == pytest.approx(TOKYO["population"] + 2691000, abs=1)
@@ -0,0 +1,42 @@
+import json
+
+import numpy as np
+import pytest
+
+from simulation import build_population_raster
+
+GRID = [[1, 2, 3], [4, -9999, 6]]
+
+
+def write_grid(path, header):
+    rows = [' '.join(str(value) for value in row) for row in GRID]
+    path.write_text('\n'.join(header + rows) + '\n')
+
+
+def test_header_without_nodata_value(tmp_path):
+    grid = tmp_path / 'grid.asc'
+    write_grid(grid, ['ncols 3', 'nrows 2', 'xllcorner -10', 'yllcorner 20', 'cellsize 0.5'])
+    build_population_raster(str(grid), str(tmp_path / 'pop'))
+
+    sat = np.load(str(tmp_path / 'pop.sat.npy'))
+    assert sat[-1, -1] == sum(map(sum, GRID))
+    meta = json.loads((tmp_path / 'pop.json').read_text())
+    assert (meta["xllcorner"], meta["yllcorner"], meta["cellsize"]) == (-10, 20, 0.5)
+
+
+def test_nodata_cells_and_center_registration(tmp_path):
+    grid = tmp_path / 'grid.asc'
+    write_grid(grid, ['NCOLS 3', 'NROWS 2', 'XLLCENTER -10', 'YLLCENTER 20', 'CELLSIZE 0.5', 'NODATA_value -9999'])
+    build_population_raster(str(grid), str(tmp_path / 'pop'))
+
+    sat = np.load(str(tmp_path / 'pop.sat.npy'))
+    assert sat[-1, -1] == 16
+    meta = json.loads((tmp_path / 'pop.json').read_text())
+    assert (meta["xllcorner"], meta["yllcorner"]) == (-10.25, 19.75)
+
+
+def test_rejects_rows_of_the_wrong_width(tmp_path):
+    grid = tmp_path / 'grid.asc'
+    grid.write_text('ncols 4\nnrows 2\nxllcorner 0\nyllcorner 0\ncellsize 1\n1 2 3 4\n5 6 7\n')
+    with pytest.raises(ValueError):
+        build_population_raster(str(grid), str(tmp_path / 'pop'))
@@ -0,0 +1,138 @@
+import multiprocessing
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from simulation import TileCache
+
+TILE_BYTES = 100
+
+
+class StubTileServer:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.requests = []
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub.lock:
+                    stub.requests.append(self.path)
+                time.sleep(stub.delay)
+                body = self.path.encode('ascii').ljust(TILE_BYTES, b'.')
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/png')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def layers(self):
+        return {"stub": {"url": "http://127.0.0.1:%d/{z}/{x}/{y}.png" % self.server.server_port, "mimetype": "image/png"}}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def upstream():
+    server = StubTileServer()
+    yield server
+    server.close()
+
+
+def test_concurrent_misses_share_one_upstream_request(tmp_path, upstream):
+    upstream.delay = 0.2
+    cache = TileCache(str(tmp_path), 1 << 20, upstream.layers)
+    barrier = threading.Barrier(10)
+    bodies = []
+
+    def fetch():
+        barrier.wait()
+        bodies.append(cache.fetch('stub', 3, 1, 2))
+
+    threads = [threading.Thread(target=fetch) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert upstream.requests == ['/3/1/2.png']
+    assert len(bodies) == 10 and len(set(bodies)) == 1
+    assert cache.stats()["misses"] == 10
+    assert cache.stats()["tiles"] == 1
+
+
+def test_evicts_least_recently_used_tiles_by_bytes(tmp_path, upstream):
+    cache = TileCache(str(tmp_path), 2 * TILE_BYTES + TILE_BYTES // 2, upstream.layers)
+    cache.fetch('stub', 1, 0, 0)
+    cache.fetch('stub', 1, 0, 1)
+    # touching the first tile makes the second the least recently used
+    cache.fetch('stub', 1, 0, 0)
+    cache.fetch('stub', 1, 1, 0)
+
+    assert not os.path.exists(cache.path('stub', 1, 0, 1))
+    assert os.path.exists(cache.path('stub', 1, 0, 0))
+    assert os.path.exists(cache.path('stub', 1, 1, 0))
+    stats = cache.stats()
+    assert stats["tiles"] == 2 and stats["bytes"] == 2 * TILE_BYTES
+    assert stats["hits"] == 1 and len(upstream.requests) == 3
+
+
+def test_rebuilds_index_and_recency_on_restart(tmp_path, upstream):
+    cache = TileCache(str(tmp_path), 1 << 20, upstream.layers)
+    for x in range(3):
+        cache.fetch('stub', 2, x, 0)
+        time.sleep(0.01)
+    # the first tile becomes the most recently used
+    cache.fetch('stub', 2, 0, 0)
+
+    restarted = TileCache(str(tmp_path), 3 * TILE_BYTES, upstream.layers)
+    assert restarted.stats()["tiles"] == 3
+    assert restarted.stats()["bytes"] == 3 * TILE_BYTES
+
+    restarted.fetch('stub', 2, 3, 0)
+    assert not os.path.exists(restarted.path('stub', 2, 1, 0))
+    assert os.path.exists(restarted.path('stub', 2, 0, 0))
+    assert os.path.exists(restarted.path('stub', 2, 2, 0))
+
+    assert restarted.fetch('stub', 2, 0, 0).startswith(b'/2/0/0.png')
+    assert len(upstream.requests) == 4
+    assert restarted.stats()["hits"] == 1
+
+
+def fill_cache(root, max_bytes, worker):
+    cache = TileCache(root, max_bytes, {})
+    for y in range(20):
+        cache.store(cache.path('stub', 5, worker, y), bytes(TILE_BYTES))
+
+
+def test_processes_share_one_byte_budget(tmp_path):
+    root = str(tmp_path)
+    max_bytes = 5 * TILE_BYTES
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=fill_cache, args=(root, max_bytes, worker)) for worker in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    on_disk = [os.path.join(directory, filename) for directory, _, files in os.walk(root)
+               for filename in files if not filename.startswith('.')]
+    assert sum(os.path.getsize(path) for path in on_disk) <= max_bytes
+    stats = TileCache(root, max_bytes, {}).stats()
+    assert stats["tiles"] == len(on_disk) == 5
+    assert stats["bytes"] == 5 * TILE_BYTES
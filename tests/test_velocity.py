@@ -0,0 +1,24 @@
+import pytest
+
+from simulation import app, ASTEROIDS, LOCATIONS, normalize_velocity
+
+
+@pytest.mark.parametrize("velocity", [1e300, -5, 0, 100.5, float('inf'), float('nan'), "fast", None])
+def test_rejects_out_of_range_velocity(velocity):
+    with pytest.raises((TypeError, ValueError)):
+        normalize_velocity(velocity)
+
+
+def test_whole_velocities_become_ints():
+    assert normalize_velocity(20.0) == 20 and isinstance(normalize_velocity(20.0), int)
+    assert normalize_velocity("20.5") == 20.5
+
+
+def test_oversized_velocity_is_a_bad_request():
+    client = app.test_client()
+    response = client.post('/api/simulate', json={
+        "asteroid": next(iter(ASTEROIDS.featured)),
+        "location": next(iter(LOCATIONS.featured)),
+        "velocity": 1e300
+    })
+    assert response.status_code == 400